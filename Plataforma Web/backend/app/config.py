@@ -2,8 +2,9 @@
 Application configuration
 """
 from pydantic_settings import BaseSettings
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,6 +14,8 @@ class Settings(BaseSettings):
     # File uploads
     UPLOAD_DIR: Path = Path("uploads")
     MAX_UPLOAD_SIZE: int = 500 * 1024 * 1024  # 500MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # streamed uploads are read 1MB at a time
+    MAX_VIDEO_UPLOAD_SIZE: int = 10 * 1024 * 1024 * 1024  # 10GB, /api/ai/analyze-video
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -21,9 +24,64 @@ class Settings(BaseSettings):
     AI_MODEL_PATH: str = "../PonteInspecao.lib/best_deeplab_lr0.0001_bs4_fold2.pth"
     AI_IMAGE_SIZE: int = 512
     AI_THRESHOLD: float = 0.30
+    AI_BATCH_SIZE: int = 8  # images per forward pass (1-2 can be faster on single-core CPU hosts)
+    AI_SERVER_ENABLED: bool = True  # batch concurrent /api/ai/analyze requests together
+    AI_MAX_BATCH: int = 8  # largest micro-batch formed across requests
+    AI_MAX_WAIT_MS: float = 10.0  # how long a request may wait for others to join its batch
+    AI_SERVER_QUEUE_SIZE: int = 32  # inputs queued for the batcher; further requests wait (backpressure)
+    AI_TILED_ENABLED: bool = False  # analyze large photos as overlapping full-resolution tiles
+    AI_TILE_OVERLAP: int = 64  # pixels shared by neighbouring tiles, blended
+    AI_MAX_TILES: int = 144  # larger images are downscaled until the grid fits
+    AI_TILE_MIN_STD: float = 4.0  # tiles with less grey-level deviation are skipped as blank
+    AI_VIDEO_DIFF_THRESHOLD: float = 2.0  # mean grey-level change below which a sampled frame is a duplicate
+    AI_VIDEO_QUEUE_SIZE: int = 16  # decoded frames buffered ahead of the model
+    AI_VIDEO_SEGMENT_GAP: float = 2.0  # seconds without detections that close a timeline segment
+    AI_ARTIFACTS: List[str] = ["mask", "heatmap"]  # default outputs per analyzed image (also: result)
+    AI_ARTIFACT_WORKERS: int = 2  # threads encoding artifacts while inference continues
+    AI_PNG_COMPRESSION: int = 1  # 0-9, mask and heatmap PNGs
+    AI_JPEG_QUALITY: int = 90  # 0-100, contour overlay JPEGs
+    AI_BACKEND: str = "torch"  # torch (eager fp32), int8, torchscript or onnx
+    AI_EXPORT_DIR: Optional[Path] = None  # exported TorchScript/ONNX models; default next to the checkpoint
+    AI_ONNX_THREADS: int = 0  # ONNX Runtime intra-op threads, 0 = runtime default
+    AI_CACHE_ENABLED: bool = True  # reuse results for re-submitted images
+    AI_CACHE_DIR: Path = Path("cache/ai")
+    AI_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 2GB, LRU eviction
+    AI_POLYGON_EPSILON: float = 1.5  # detection polygon simplification, in mask pixels
+    AI_MIN_REGION_AREA: int = 4  # smaller detected regions (mask pixels) get no polygon
+    AI_PREFETCH_WORKERS: int = 2  # threads decoding and normalizing upcoming images
+    AI_PREFETCH_BATCHES: int = 2  # batches in flight (preallocated input buffers)
+    # Thread budget: keep (uvicorn workers x AI_INFERENCE_WORKERS x threads) within the cores;
+    # with several uvicorn workers set AI_PROCESS_SLOTS to their number so pools split the cores
+    AI_TORCH_THREADS: int = 0  # intra-op threads for in-process inference, 0 = PyTorch default
+    AI_INFERENCE_WORKERS: int = 0  # >0 = run the inference server's batches in this many processes
+    AI_THREADS_PER_WORKER: int = 0  # 0 = split the available cores evenly between workers
+    AI_PIN_WORKERS: bool = False  # give each worker its own cores (Linux)
+    AI_PROCESS_SLOTS: int = 1  # server processes (uvicorn workers) sharing the cores; each pool uses a 1/n slice
+    AI_SLOT_DIR: Path = Path("cache/cores")  # lock files of the claimed core slices
+    AI_MODEL_CACHE_SIZE: int = 2  # checkpoints kept loaded per process (LRU)
+    AI_WARM_ON_STARTUP: bool = True  # load the model when the API starts
     
     # IFC Processing
     IFC_CACHE_DIR: Path = Path("cache/ifc")
+    IFC_CACHE_ENABLED: bool = True
+    IFC_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # 5GB, LRU eviction
+    IFC_BULK_INSERT: bool = True  # False = legacy per-object ORM loop
+    IFC_BATCH_SIZE: int = 5000  # rows per bulk write
+    IFC_USE_COPY: bool = True  # use PostgreSQL COPY when available
+    IFC_WORKERS: int = 1  # >1 = parse element partitions in a process pool
+    IFC_GEOMETRY_ENABLED: bool = False  # tessellate products for bounding boxes / spatial queries
+    IFC_GEOMETRY_THREADS: int = os.cpu_count() or 1
+    
+    # Ingestion queue (processed by worker.py)
+    INGESTION_QUEUE_ENABLED: bool = True  # False = process in the API's BackgroundTasks
+    INGESTION_WORKERS: int = 2  # worker processes started by worker.py
+    INGESTION_MAX_QUEUED: int = 50  # uploads get 503 while this many jobs are waiting
+    INGESTION_MAX_ATTEMPTS: int = 3
+    INGESTION_RETRY_DELAY: float = 30.0  # seconds, doubled per failed attempt
+    INGESTION_POLL_INTERVAL: float = 2.0  # seconds between polls of an empty queue
+    INGESTION_PROGRESS_INTERVAL: float = 1.0  # seconds between progress writes
+    INGESTION_HEARTBEAT_INTERVAL: float = 30.0  # seconds between heartbeats of a running job
+    INGESTION_STALE_SECONDS: int = 900  # running jobs without heartbeat are requeued (or failed)
     
     # JWT (if needed)
     SECRET_KEY: str = "your-secret-key-change-in-production"
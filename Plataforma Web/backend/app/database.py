@@ -34,7 +34,7 @@ def init_db():
     """Initialize database tables"""
     from app.models import (
         Asset, Inspection, InspectionPhoto, IFCFile, 
-        IFCElement, PropertySet, Property, MIRRequirement
+        IFCElement, PropertySet, Property, MIRRequirement, IngestionJob, AIDetection
     )
     Base.metadata.create_all(bind=engine)
 
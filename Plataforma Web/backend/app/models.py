@@ -2,7 +2,7 @@
 SQLAlchemy models for BIM-FM Platform
 Based on MIR (Minimum Information Requirements) - 45 requirements
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -34,6 +34,17 @@ class Asset(Base):
     location_room = Column(String)
     location_coordinates = Column(JSON)  # PostGIS geometry stored as JSON
     
+    # Geometry (world coordinates, filled when IFC_GEOMETRY_ENABLED)
+    centroid_x = Column(Float)
+    centroid_y = Column(Float)
+    centroid_z = Column(Float)
+    bbox_min_x = Column(Float)
+    bbox_min_y = Column(Float)
+    bbox_min_z = Column(Float)
+    bbox_max_x = Column(Float)
+    bbox_max_y = Column(Float)
+    bbox_max_z = Column(Float)
+    
     # MIR Requirements - Warranty
     warranty_start_date = Column(DateTime)
     warranty_end_date = Column(DateTime)
@@ -67,6 +78,15 @@ class Asset(Base):
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("idx_assets_centroid", "centroid_x", "centroid_y", "centroid_z"),
+        Index("idx_assets_location_path", "location_building", "location_floor", "location_room"),
+        Index("idx_assets_location_room", "location_room"),
+        # Keyset pagination: filter column(s) followed by the sort key
+        Index("idx_assets_file", "ifc_file_id", "id"),
+        Index("idx_assets_condition", "condition_status", "id"),
+    )
 
 
 class IFCFile(Base):
@@ -77,10 +97,14 @@ class IFCFile(Base):
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer)  # bytes
+    file_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
     ifc_schema = Column(String)  # IFC2X3, IFC4, etc.
     project_name = Column(String)
     project_description = Column(Text)
     
+    # Revision counter, bumped by each incremental re-upload
+    revision = Column(Integer, default=1)
+    
     # Processing status
     processing_status = Column(String, default="pending")  # pending, processing, completed, error
     processing_error = Column(Text)
@@ -88,12 +112,49 @@ class IFCFile(Base):
     # Relationships
     assets = relationship("Asset", back_populates="ifc_file")
     elements = relationship("IFCElement", back_populates="ifc_file", cascade="all, delete-orphan")
+    jobs = relationship("IngestionJob", back_populates="ifc_file", cascade="all, delete-orphan")
     
     # Timestamps
     uploaded_at = Column(DateTime, server_default=func.now())
     processed_at = Column(DateTime)
 
 
+class IngestionJob(Base):
+    """Queued IFC processing job, claimed by worker.py processes"""
+    __tablename__ = "ingestion_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_path = Column(String, nullable=False)
+    incremental = Column(Boolean, default=False)  # revision upload, apply differences only
+    
+    # Queue state
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, server_default=func.now())  # retry backoff
+    worker_id = Column(String)
+    heartbeat_at = Column(DateTime)  # refreshed with progress; stale running jobs are requeued
+    error = Column(Text)
+    
+    # Progress
+    progress_done = Column(Integer, default=0)  # elements processed
+    progress_total = Column(Integer)
+    rate = Column(Float)  # elements per second
+    
+    # Relationships
+    ifc_file_id = Column(Integer, ForeignKey("ifc_files.id"), nullable=False, index=True)
+    ifc_file = relationship("IFCFile", back_populates="jobs")
+    
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("idx_ingestion_jobs_claim", "status", "run_after"),
+    )
+
+
 class IFCElement(Base):
     """Raw IFC element data"""
     __tablename__ = "ifc_elements"
@@ -106,6 +167,7 @@ class IFCElement(Base):
     
     # Raw IFC data as JSON
     ifc_data = Column(JSON)
+    content_hash = Column(String(40))  # SHA-1 of the extracted data, for revision diffs
     
     # Relationships
     ifc_file_id = Column(Integer, ForeignKey("ifc_files.id"), nullable=False)
@@ -113,15 +175,20 @@ class IFCElement(Base):
     
     asset_id = Column(Integer, ForeignKey("assets.id"))
     asset = relationship("Asset", foreign_keys=[asset_id])
+    
+    __table_args__ = (
+        Index("idx_ifc_elements_file", "ifc_file_id", "id"),
+    )
 
 
 class PropertySet(Base):
-    """IFC Property Set"""
+    """IFC Property Set (deduplicated: one row per distinct name + property values)"""
     __tablename__ = "property_sets"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
+    content_hash = Column(String(40), unique=True, index=True)  # SHA-1 of name + properties
     
     # Relationships
     properties = relationship("Property", back_populates="property_set", cascade="all, delete-orphan")
@@ -130,18 +197,23 @@ class PropertySet(Base):
 class Property(Base):
     """IFC Property"""
     __tablename__ = "properties"
+    __table_args__ = (
+        Index("idx_properties_name_value", "name", "value"),
+        Index("idx_properties_name_number", "name", "value_number"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     value = Column(Text)
+    value_number = Column(Float)  # numeric form of value, for range filters
     data_type = Column(String)  # String, Integer, Float, Boolean, etc.
     unit = Column(String)
     
     # Relationships
-    property_set_id = Column(Integer, ForeignKey("property_sets.id"))
+    property_set_id = Column(Integer, ForeignKey("property_sets.id"), index=True)
     property_set = relationship("PropertySet", back_populates="properties")
     
-    asset_id = Column(Integer, ForeignKey("assets.id"))
+    asset_id = Column(Integer, ForeignKey("assets.id"), index=True)
     asset = relationship("Asset", back_populates="properties")
 
 
@@ -171,10 +243,16 @@ class Inspection(Base):
     asset = relationship("Asset", back_populates="inspections")
     
     photos = relationship("InspectionPhoto", back_populates="inspection", cascade="all, delete-orphan")
+    detections = relationship("AIDetection", back_populates="inspection", cascade="all, delete-orphan")
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("idx_inspections_date", "inspection_date", "id"),
+        Index("idx_inspections_asset", "asset_id", "inspection_date", "id"),
+    )
 
 
 class InspectionPhoto(Base):
@@ -190,11 +268,43 @@ class InspectionPhoto(Base):
     # Relationships
     inspection_id = Column(Integer, ForeignKey("inspections.id"), nullable=False)
     inspection = relationship("Inspection", back_populates="photos")
+    detections = relationship("AIDetection", back_populates="photo")
     
     # Timestamps
     uploaded_at = Column(DateTime, server_default=func.now())
 
 
+class AIDetection(Base):
+    """AI detection for one analyzed photo: compact RLE mask plus region polygons"""
+    __tablename__ = "ai_detections"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    image_path = Column(String, nullable=False)
+    width = Column(Integer)  # original image size; polygons use these coordinates
+    height = Column(Integer)
+    confidence = Column(Float)  # fraction of pixels above the threshold
+    threshold = Column(Float)
+    
+    # COCO-style compressed RLE of the model-resolution mask
+    mask_rle = Column(Text)
+    mask_width = Column(Integer)
+    mask_height = Column(Integer)
+    
+    # [{"area", "bbox", "polygon"}] in image pixels, largest first
+    regions = Column(JSON)
+    region_count = Column(Integer, default=0)
+    total_area = Column(Float, default=0.0)
+    
+    # Relationships
+    inspection_id = Column(Integer, ForeignKey("inspections.id"), index=True)
+    inspection = relationship("Inspection", back_populates="detections")
+    photo_id = Column(Integer, ForeignKey("inspection_photos.id"), index=True)
+    photo = relationship("InspectionPhoto", back_populates="detections")
+    
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class MIRRequirement(Base):
     """MIR (Minimum Information Requirements) tracking"""
     __tablename__ = "mir_requirements"
@@ -1,17 +1,23 @@
 """
 AI Analysis router for image/video processing
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
 from pathlib import Path
 
 from app.database import get_db
-from app.models import Inspection, Asset
-from app.schemas import AIAnalysisRequest, AIAnalysisResult
+from app.models import Inspection, Asset, AIDetection
+from app.schemas import AIAnalysisRequest, AIAnalysisResult, AIDetection as AIDetectionSchema
 from app.config import settings
-from app.services.ai_service import analyze_image_with_ai
+from app.services.ai_service import analyze_image_with_ai, analyze_images_async, get_model, get_model_registry
+from app.services.inference_pool import reload_inference_pool
+from app.services.inference_server import get_inference_server
+from app.services.artifact_writer import parse_artifacts, unique_stem
+from app.services.upload_writer import save_upload
+from app.services.video_analysis import analyze_video_file
 
 router = APIRouter()
 
@@ -21,6 +27,7 @@ async def analyze_images(
     images: List[UploadFile] = File(...),
     asset_id: int = None,
     inspection_id: int = None,
+    artifacts: Optional[str] = Query(None, description="comma-separated subset of mask,heatmap,result"),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db)
 ):
@@ -28,6 +35,11 @@ async def analyze_images(
     if not images:
         raise HTTPException(status_code=400, detail="No images provided")
     
+    try:
+        selected = parse_artifacts(artifacts) if artifacts is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # Validate asset or inspection exists
     if asset_id:
         asset = db.query(Asset).filter(Asset.id == asset_id).first()
@@ -45,26 +57,24 @@ async def analyze_images(
     
     image_paths = []
     for image in images:
-        file_path = upload_dir / image.filename
-        content = await image.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Unique names: same-named uploads must not overwrite each other's inputs
+        name = Path(image.filename or "image").name
+        file_path = upload_dir / f"{unique_stem(name)}{Path(name).suffix}"
+        await save_upload(image, file_path)
         image_paths.append(str(file_path))
     
-    # Process images with AI
+    # Process images with AI, off the event loop
     try:
-        results = analyze_image_with_ai(image_paths, settings)
+        if settings.AI_SERVER_ENABLED:
+            results = await analyze_images_async(image_paths, settings, selected)
+        else:
+            results = await asyncio.to_thread(analyze_image_with_ai, image_paths, settings, selected)
         
         # Update inspection if provided
         if inspection_id:
             inspection = db.query(Inspection).filter(Inspection.id == inspection_id).first()
             if inspection and results["detections"]:
-                inspection.ai_analysis_performed = True
-                inspection.ai_confidence = results["confidence"]
-                if results.get("mask_path"):
-                    inspection.ai_detection_mask_path = results["mask_path"]
-                if results.get("heatmap_path"):
-                    inspection.ai_heatmap_path = results["heatmap_path"]
+                record_inspection_results(db, inspection, results)
                 db.commit()
         
         return AIAnalysisResult(**results)
@@ -73,16 +83,203 @@ async def analyze_images(
         raise HTTPException(status_code=500, detail=f"AI analysis failed: {str(e)}")
 
 
+@router.get("/models")
+def list_loaded_models():
+    """Models currently loaded in this process"""
+    return {"models": get_model_registry(settings).info()}
+
+
+@router.get("/server")
+async def inference_server_stats():
+    """Micro-batching statistics of this process's inference server"""
+    return get_inference_server(settings).info()
+
+
+@router.post("/models/reload")
+def reload_model():
+    """Reload the configured checkpoint (after deploying a new model file), here and in the inference pool"""
+    try:
+        get_model(settings, reload=True)
+    except (ImportError, FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=503, detail=f"Model not available: {str(e)}")
+    reload_inference_pool(settings)
+    return {"models": get_model_registry(settings).info()}
+
+
 @router.post("/analyze-video")
 async def analyze_video(
     video: UploadFile = File(...),
     asset_id: int = None,
     inspection_id: int = None,
-    fps: float = 1.0,
+    fps: float = Query(1.0, gt=0, le=60),
+    db: Session = Depends(get_db)
+):
+    """
+    Analyze video using AI model
+    Frames are sampled at fps and streamed through the model; per-frame results
+    and the detection timeline are written as JSONL next to the masks
+    """
+    if asset_id:
+        asset = db.query(Asset).filter(Asset.id == asset_id).first()
+        if not asset:
+            raise HTTPException(status_code=404, detail="Asset not found")
+    
+    if inspection_id:
+        inspection = db.query(Inspection).filter(Inspection.id == inspection_id).first()
+        if not inspection:
+            raise HTTPException(status_code=404, detail="Inspection not found")
+    
+    # Stream the upload to disk (videos can be several GB)
+    upload_dir = settings.UPLOAD_DIR / "videos" / "ai_input"
+    name = Path(video.filename or "video").name
+    file_path = upload_dir / f"{unique_stem(name)}{Path(name).suffix}"
+    await save_upload(video, file_path, max_size=settings.MAX_VIDEO_UPLOAD_SIZE)
+    output_dir = settings.UPLOAD_DIR / "results" / "ai_video" / file_path.stem
+    
+    try:
+        results = await asyncio.to_thread(analyze_video_file, str(file_path), settings, fps, output_dir)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI video analysis failed: {str(e)}")
+    
+    if inspection_id and results["frames_analyzed"]:
+        inspection = db.query(Inspection).filter(Inspection.id == inspection_id).first()
+        if inspection:
+            inspection.ai_analysis_performed = True
+            inspection.ai_confidence = results["max_confidence"]
+            db.commit()
+    
+    return results
+
+
+
+@router.post("/inspections/{inspection_id}/analyze", response_model=List[AIDetectionSchema])
+async def analyze_inspection_photos(
+    inspection_id: int,
+    photo_ids: Optional[List[int]] = Query(None, description="photos to analyze (default: all)"),
+    artifacts: Optional[str] = Query(None, description="comma-separated subset of mask,heatmap,result"),
+    db: Session = Depends(get_db)
+):
+    """Analyze an inspection's stored photos and keep one detection per photo"""
+    inspection = db.query(Inspection).filter(Inspection.id == inspection_id).first()
+    if not inspection:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    try:
+        selected = parse_artifacts(artifacts) if artifacts is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    photos = inspection.photos
+    if photo_ids:
+        photos = [photo for photo in photos if photo.id in set(photo_ids)]
+    if not photos:
+        raise HTTPException(status_code=400, detail="No photos to analyze")
+    image_paths = [photo.file_path for photo in photos]
+    
+    try:
+        if settings.AI_SERVER_ENABLED:
+            results = await analyze_images_async(image_paths, settings, selected)
+        else:
+            results = await asyncio.to_thread(analyze_image_with_ai, image_paths, settings, selected)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI analysis failed: {str(e)}")
+    
+    rows = record_inspection_results(db, inspection, results, {photo.file_path: photo.id for photo in photos})
+    db.commit()
+    return [detection_response(row) for row in rows]
+
+
+@router.get("/inspections/{inspection_id}/detections", response_model=List[AIDetectionSchema])
+def list_inspection_detections(
+    inspection_id: int,
+    photo_id: Optional[int] = None,
+    include_rle: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Analyze video using AI model"""
-    # TODO: Implement video analysis
-    # This would extract frames and process them similar to analyze_images
-    return {"message": "Video analysis to be implemented"}
+    """Stored detections of an inspection with their overlay polygons"""
+    query = db.query(AIDetection).filter(AIDetection.inspection_id == inspection_id)
+    if photo_id is not None:
+        query = query.filter(AIDetection.photo_id == photo_id)
+    return [detection_response(row, include_rle) for row in query.order_by(AIDetection.id).all()]
+
+
+@router.get("/detections/{detection_id}", response_model=AIDetectionSchema)
+def get_detection(detection_id: int, include_rle: bool = False, db: Session = Depends(get_db)):
+    """One stored detection; include_rle adds the compressed mask"""
+    row = db.query(AIDetection).filter(AIDetection.id == detection_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Detection not found")
+    return detection_response(row, include_rle)
+
+
+def record_inspection_results(db: Session, inspection: Inspection, results: Dict[str, Any],
+                              photo_ids: Optional[Dict[str, int]] = None) -> List[AIDetection]:
+    """
+    Update the inspection's AI summary and store one AIDetection per analyzed
+    image, replacing earlier detections of the same photo (or image path)
+    """
+    inspection.ai_analysis_performed = True
+    inspection.ai_confidence = results["confidence"]
+    if results.get("mask_path"):
+        inspection.ai_detection_mask_path = results["mask_path"]
+    if results.get("heatmap_path"):
+        inspection.ai_heatmap_path = results["heatmap_path"]
+    
+    photo_ids = photo_ids or {}
+    analyzed = [detection["image_path"] for detection in results["detections"]]
+    replaced_photos = [photo_ids[path] for path in analyzed if path in photo_ids]
+    replaced_paths = [path for path in analyzed if path not in photo_ids]
+    if replaced_photos:
+        db.query(AIDetection).filter(
+            AIDetection.inspection_id == inspection.id, AIDetection.photo_id.in_(replaced_photos)
+        ).delete(synchronize_session=False)
+    if replaced_paths:
+        db.query(AIDetection).filter(
+            AIDetection.inspection_id == inspection.id, AIDetection.photo_id.is_(None),
+            AIDetection.image_path.in_(replaced_paths),
+        ).delete(synchronize_session=False)
+    
+    rows = []
+    for detection in results["detections"]:
+        mask_rle = detection.get("mask_rle") or {}
+        mask_height, mask_width = mask_rle.get("size", (None, None))
+        regions = detection.get("regions") or []
+        row = AIDetection(
+            inspection_id=inspection.id,
+            photo_id=photo_ids.get(detection["image_path"]),
+            image_path=detection["image_path"],
+            width=detection.get("width"),
+            height=detection.get("height"),
+            confidence=detection["confidence"],
+            threshold=settings.AI_THRESHOLD,
+            mask_rle=mask_rle.get("counts"),
+            mask_width=mask_width,
+            mask_height=mask_height,
+            regions=regions,
+            region_count=len(regions),
+            total_area=float(sum(region["area"] for region in regions)),
+        )
+        db.add(row)
+        rows.append(row)
+    db.flush()
+    return rows
+
 
+def detection_response(row: AIDetection, include_rle: bool = False) -> AIDetectionSchema:
+    return AIDetectionSchema(
+        id=row.id,
+        inspection_id=row.inspection_id,
+        photo_id=row.photo_id,
+        image_path=row.image_path,
+        width=row.width,
+        height=row.height,
+        confidence=row.confidence,
+        threshold=row.threshold,
+        region_count=row.region_count or 0,
+        total_area=row.total_area or 0.0,
+        regions=row.regions or [],
+        mask_rle={"size": [row.mask_height, row.mask_width], "counts": row.mask_rle}
+        if include_rle and row.mask_rle is not None else None,
+        created_at=row.created_at,
+    )
@@ -1,34 +1,159 @@
 """
 Asset management router
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import re
 from app.database import get_db
-from app.models import Asset, Inspection
-from app.schemas import Asset as AssetSchema, AssetUpdate
+from app.models import Asset, Inspection, Property, PropertySet
+from app.schemas import Asset as AssetSchema, AssetDistance, AssetUpdate
+from app.services.asset_statistics import asset_statistics
+from app.services.pagination import TOTAL_PATTERN, keyset_page
+from app.services.spatial_index import spatial_index
 
 router = APIRouter()
 
+MAX_STATISTICS_IDS = 1000
+CONDITION_PATTERN = re.compile(r"^(?P<name>[^<>=]+?)\s*(?P<op><=|>=|=|<|>)\s*(?P<value>.*)$")
+
 
 @router.get("/", response_model=List[AssetSchema])
 def list_assets(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
     ifc_file_id: Optional[int] = None,
     condition_status: Optional[str] = None,
+    location_building: Optional[str] = None,
+    location_floor: Optional[str] = None,
+    location_room: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """List all assets"""
+    """
+    List all assets by id; pass the X-Next-Cursor response header back as
+    ?cursor= for the next page and ?total=exact|estimate for X-Total-Count
+    """
     query = db.query(Asset)
     
     if ifc_file_id:
         query = query.filter(Asset.ifc_file_id == ifc_file_id)
     if condition_status:
         query = query.filter(Asset.condition_status == condition_status)
+    if location_building:
+        query = query.filter(Asset.location_building == location_building)
+    if location_floor:
+        query = query.filter(Asset.location_floor == location_floor)
+    if location_room:
+        query = query.filter(Asset.location_room == location_room)
+    
+    return keyset_page(query, [Asset.id], response, cursor, limit, skip=skip, total=total)
+
+
+@router.get("/filter", response_model=List[AssetSchema])
+def filter_assets(
+    response: Response,
+    ifc_type: Optional[str] = None,
+    ifc_file_id: Optional[int] = None,
+    where: List[str] = Query([]),
+    property_set: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Filter assets by IFC type and property values
+    Each `where` is "Name=Value" (text match) or "Name<op>number" with op in <, <=, >, >=,
+    e.g. ?ifc_type=IfcDoor&where=FireRating=EI60. Conditions are ANDed and run
+    against the indexed property rows, optionally restricted to one property set name.
+    Paginated by id like list_assets.
+    """
+    query = db.query(Asset)
+    
+    if ifc_type:
+        query = query.filter(Asset.ifc_type == ifc_type)
+    if ifc_file_id:
+        query = query.filter(Asset.ifc_file_id == ifc_file_id)
+    
+    for condition in where:
+        matching = select(Property.asset_id).where(parse_property_condition(condition))
+        if property_set:
+            matching = matching.where(
+                Property.property_set_id.in_(select(PropertySet.id).where(PropertySet.name == property_set))
+            )
+        query = query.filter(Asset.id.in_(matching))
     
-    assets = query.offset(skip).limit(limit).all()
-    return assets
+    return keyset_page(query, [Asset.id], response, cursor, limit, skip=skip)
+
+
+@router.get("/spatial/box", response_model=List[AssetSchema])
+def assets_in_box(
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    min_z: Optional[float] = None,
+    max_z: Optional[float] = None,
+    ifc_file_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Assets whose centroid lies inside the box (z bounds are optional)"""
+    if min_x > max_x or min_y > max_y or (min_z is not None and max_z is not None and min_z > max_z):
+        raise HTTPException(status_code=400, detail="Box minimum must not exceed maximum")
+    ids = spatial_index(db, ifc_file_id).box((min_x, min_y, min_z), (max_x, max_y, max_z))
+    return load_assets(db, ids[:limit])
+
+
+@router.get("/spatial/radius", response_model=List[AssetDistance])
+def assets_within_radius(
+    x: float,
+    y: float,
+    radius: float = Query(..., ge=0),
+    z: Optional[float] = None,
+    ifc_file_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Assets whose centroid is within radius of the point, nearest first (planar when z is omitted)"""
+    matches = spatial_index(db, ifc_file_id).within((x, y, z), radius)[:limit]
+    return with_distances(db, matches)
+
+
+@router.get("/spatial/nearest", response_model=List[AssetDistance])
+def nearest_assets(
+    x: float,
+    y: float,
+    z: Optional[float] = None,
+    k: int = Query(10, ge=1, le=1000),
+    ifc_file_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """The k assets whose centroids are nearest to the point (planar when z is omitted)"""
+    matches = spatial_index(db, ifc_file_id).nearest((x, y, z), k)
+    return with_distances(db, matches)
+
+
+@router.get("/statistics")
+def get_assets_statistics(
+    asset_id: List[int] = Query([]),
+    ifc_file_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Statistics of many assets in one request, e.g. ?asset_id=1&asset_id=2 or
+    ?ifc_file_id=3 (both combine as AND), ordered by asset id
+    """
+    if not asset_id and ifc_file_id is None:
+        raise HTTPException(status_code=400, detail="Give asset_id values and/or ifc_file_id")
+    if len(asset_id) > MAX_STATISTICS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATISTICS_IDS} asset_id values per request")
+    statistics = asset_statistics(db, asset_ids=asset_id or None, ifc_file_id=ifc_file_id)
+    return list(statistics.values())
 
 
 @router.get("/{asset_id}", response_model=AssetSchema)
@@ -72,29 +197,47 @@ def get_asset_inspections(asset_id: int, db: Session = Depends(get_db)):
 
 @router.get("/{asset_id}/statistics")
 def get_asset_statistics(asset_id: int, db: Session = Depends(get_db)):
-    """Get statistics for an asset"""
-    asset = db.query(Asset).filter(Asset.id == asset_id).first()
-    if not asset:
+    """Get statistics for an asset (aggregated in SQL)"""
+    statistics = asset_statistics(db, asset_ids=[asset_id])
+    if asset_id not in statistics:
         raise HTTPException(status_code=404, detail="Asset not found")
+    return statistics[asset_id]
+
+
+
+def parse_property_condition(condition: str):
+    """Turn a "Name=Value" / "Name>=number" filter into a SQL condition on Property"""
+    match = CONDITION_PATTERN.match(condition)
+    if not match:
+        raise HTTPException(status_code=400, detail=f"Invalid property condition: {condition}")
+    name, op, value = match.group("name").strip(), match.group("op"), match.group("value").strip()
     
-    inspections = db.query(Inspection).filter(Inspection.asset_id == asset_id).all()
-    
-    total_inspections = len(inspections)
-    inspections_with_pathology = sum(1 for i in inspections if i.has_pathology)
-    latest_inspection = max(inspections, key=lambda x: x.inspection_date) if inspections else None
-    
-    severity_distribution = {}
-    for inspection in inspections:
-        if inspection.severity:
-            severity_distribution[inspection.severity] = severity_distribution.get(inspection.severity, 0) + 1
+    if op == "=":
+        return (Property.name == name) & (Property.value == value)
     
-    return {
-        "asset_id": asset_id,
-        "total_inspections": total_inspections,
-        "inspections_with_pathology": inspections_with_pathology,
-        "latest_inspection_date": latest_inspection.inspection_date if latest_inspection else None,
-        "current_condition": asset.condition_status,
-        "current_condition_score": asset.condition_score,
-        "severity_distribution": severity_distribution
+    try:
+        number = float(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Numeric value required for '{op}' in: {condition}")
+    comparisons = {
+        "<": Property.value_number < number,
+        "<=": Property.value_number <= number,
+        ">": Property.value_number > number,
+        ">=": Property.value_number >= number,
     }
+    return (Property.name == name) & comparisons[op]
+
+
+def load_assets(db: Session, ids: List[int]) -> List[Asset]:
+    """Load assets by id, keeping the order of ids and skipping ids that no longer exist"""
+    by_id = {asset.id: asset for asset in db.query(Asset).filter(Asset.id.in_(ids))} if ids else {}
+    return [by_id[asset_id] for asset_id in ids if asset_id in by_id]
+
 
+def with_distances(db: Session, matches) -> List[dict]:
+    """Pair (asset id, distance) matches with their loaded assets"""
+    distances = dict(matches)
+    return [
+        {"asset": asset, "distance": distances[asset.id]}
+        for asset in load_assets(db, [asset_id for asset_id, _ in matches])
+    ]
@@ -54,8 +54,13 @@ def get_blender_data(ifc_file_id: int, db: Session = Depends(get_db)):
     if not ifc_file:
         raise HTTPException(status_code=404, detail="IFC file not found")
     
-    assets = db.query(Asset).filter(Asset.ifc_file_id == ifc_file_id).all()
-    inspections = db.query(Inspection).join(Asset).filter(Asset.ifc_file_id == ifc_file_id).all()
+    # Only the columns in the payload, one query per table
+    assets = db.query(
+        Asset.id, Asset.ifc_guid, Asset.name, Asset.condition_status, Asset.condition_score
+    ).filter(Asset.ifc_file_id == ifc_file_id).order_by(Asset.id).all()
+    inspections = db.query(
+        Inspection.id, Inspection.code, Inspection.asset_id, Inspection.severity, Inspection.has_pathology
+    ).join(Asset).filter(Asset.ifc_file_id == ifc_file_id).order_by(Inspection.id).all()
     
     return {
         "ifc_file": {
@@ -1,18 +1,22 @@
 """
 IFC file upload and processing router
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 import ifcopenshell
 from pathlib import Path
 
 from app.database import get_db
 from app.models import IFCFile, IFCElement, Asset
-from app.schemas import IFCFile as IFCFileSchema, IFCFileCreate
+from app.schemas import IFCFile as IFCFileSchema, IFCFileCreate, IFCFileDetail, IngestionJob as IngestionJobSchema
 from app.config import settings
+from app.services.artifact_writer import unique_stem
 from app.services.ifc_processor import process_ifc_file
+from app.services.ingestion_queue import enqueue_ingestion, latest_job, queued_job_count
+from app.services.pagination import TOTAL_PATTERN, keyset_page
+from app.services.upload_writer import save_upload
 
 router = APIRouter()
 
@@ -20,80 +24,129 @@ router = APIRouter()
 @router.post("/upload", response_model=IFCFileSchema)
 async def upload_ifc_file(
     file: UploadFile = File(...),
+    revision_of: Optional[int] = None,
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db)
 ):
-    """Upload and process IFC file"""
+    """
+    Upload and process IFC file
+    revision_of: id of an already uploaded model this file is a new revision of;
+    only the elements that changed are re-ingested and existing assets keep
+    their inspections and MIR data
+    Processing is queued for the ingestion workers (worker.py); poll
+    GET /api/ifc/{id} for progress
+    """
     # Validate file extension
     if not file.filename.endswith(('.ifc', '.IFC')):
         raise HTTPException(status_code=400, detail="File must be .ifc format")
     
+    # Backpressure: refuse new work while the queue is full
+    if settings.INGESTION_QUEUE_ENABLED and queued_job_count(db) >= settings.INGESTION_MAX_QUEUED:
+        raise HTTPException(status_code=503, detail="Ingestion queue is full, try again later",
+                            headers={"Retry-After": "60"})
+    
+    previous = None
+    if revision_of is not None:
+        previous = db.query(IFCFile).filter(IFCFile.id == revision_of).first()
+        if not previous:
+            raise HTTPException(status_code=404, detail="IFC file not found")
+    
     # Save file
     upload_dir = settings.UPLOAD_DIR / "ifc"
     upload_dir.mkdir(parents=True, exist_ok=True)
     
-    file_path = upload_dir / file.filename
-    file_size = 0
+    # Unique name on disk: a queued job must not have its file replaced by a
+    # later same-named upload; file.filename is only kept as the display name
+    display_name = Path(file.filename).name
+    file_path = upload_dir / f"{unique_stem(display_name)}{Path(display_name).suffix}"
+    
+    # Stream to disk, hashing on the way so re-uploads can hit the parse cache
+    saved = await save_upload(file, file_path)
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        file_size = len(content)
-        f.write(content)
+    if previous:
+        # New revision of an existing model: update the record in place
+        previous.filename = display_name
+        previous.file_path = str(file_path)
+        previous.file_size = saved.size
+        previous.file_hash = saved.sha256
+        previous.revision = (previous.revision or 1) + 1
+        previous.processing_status = "pending"
+        previous.processing_error = None
+        if settings.INGESTION_QUEUE_ENABLED:
+            enqueue_ingestion(db, previous, incremental=True)
+        db.commit()
+        db.refresh(previous)
+        
+        if background_tasks and not settings.INGESTION_QUEUE_ENABLED:
+            background_tasks.add_task(process_ifc_file, previous.id, str(file_path), True)
+        return previous
     
     # Create database record
     db_ifc_file = IFCFile(
-        filename=file.filename,
+        filename=display_name,
         file_path=str(file_path),
-        file_size=file_size,
+        file_size=saved.size,
+        file_hash=saved.sha256,
         processing_status="pending"
     )
     db.add(db_ifc_file)
+    db.flush()
+    if settings.INGESTION_QUEUE_ENABLED:
+        enqueue_ingestion(db, db_ifc_file)
     db.commit()
     db.refresh(db_ifc_file)
     
     # Process IFC file in background
-    if background_tasks:
+    if background_tasks and not settings.INGESTION_QUEUE_ENABLED:
         background_tasks.add_task(process_ifc_file, db_ifc_file.id, str(file_path))
     
     return db_ifc_file
 
 
 @router.get("/", response_model=List[IFCFileSchema])
-def list_ifc_files(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all uploaded IFC files"""
-    files = db.query(IFCFile).offset(skip).limit(limit).all()
-    return files
+def list_ifc_files(response: Response, cursor: Optional[str] = None, skip: int = 0, limit: int = 100,
+                   total: Optional[str] = Query(None, pattern=TOTAL_PATTERN), db: Session = Depends(get_db)):
+    """List all uploaded IFC files (keyset-paginated by id, see X-Next-Cursor)"""
+    return keyset_page(db.query(IFCFile), [IFCFile.id], response, cursor, limit, skip=skip, total=total)
 
 
-@router.get("/{file_id}", response_model=IFCFileSchema)
+@router.get("/{file_id}", response_model=IFCFileDetail)
 def get_ifc_file(file_id: int, db: Session = Depends(get_db)):
-    """Get IFC file by ID"""
+    """Get IFC file by ID, with the progress of its latest ingestion job"""
     ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
     if not ifc_file:
         raise HTTPException(status_code=404, detail="IFC file not found")
-    return ifc_file
+    detail = IFCFileDetail.model_validate(ifc_file)
+    job = latest_job(db, file_id)
+    if job:
+        detail.job = IngestionJobSchema.model_validate(job)
+    return detail
 
 
 @router.get("/{file_id}/elements")
-def get_ifc_elements(file_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all elements from an IFC file"""
+def get_ifc_elements(file_id: int, response: Response, cursor: Optional[str] = None, skip: int = 0,
+                     limit: int = 100, total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+                     db: Session = Depends(get_db)):
+    """Get all elements from an IFC file (keyset-paginated by id, see X-Next-Cursor)"""
     ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
     if not ifc_file:
         raise HTTPException(status_code=404, detail="IFC file not found")
     
-    elements = db.query(IFCElement).filter(IFCElement.ifc_file_id == file_id).offset(skip).limit(limit).all()
-    return elements
+    query = db.query(IFCElement).filter(IFCElement.ifc_file_id == file_id)
+    return keyset_page(query, [IFCElement.id], response, cursor, limit, skip=skip, total=total)
 
 
 @router.get("/{file_id}/assets")
-def get_ifc_assets(file_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all assets (processed elements) from an IFC file"""
+def get_ifc_assets(file_id: int, response: Response, cursor: Optional[str] = None, skip: int = 0,
+                   limit: int = 100, total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+                   db: Session = Depends(get_db)):
+    """Get all assets (processed elements) from an IFC file (keyset-paginated by id)"""
     ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
     if not ifc_file:
         raise HTTPException(status_code=404, detail="IFC file not found")
     
-    assets = db.query(Asset).filter(Asset.ifc_file_id == file_id).offset(skip).limit(limit).all()
-    return assets
+    query = db.query(Asset).filter(Asset.ifc_file_id == file_id)
+    return keyset_page(query, [Asset.id], response, cursor, limit, skip=skip, total=total)
 
 
 @router.post("/{file_id}/export")
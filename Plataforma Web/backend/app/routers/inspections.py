@@ -1,8 +1,8 @@
 """
 Inspection management router
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form, Query, Response
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
 import os
@@ -12,6 +12,8 @@ from app.database import get_db
 from app.models import Inspection, InspectionPhoto, Asset
 from app.schemas import Inspection as InspectionSchema, InspectionCreate, InspectionUpdate
 from app.config import settings
+from app.services.pagination import TOTAL_PATTERN, keyset_page
+from app.services.upload_writer import save_upload
 
 router = APIRouter()
 
@@ -58,55 +60,66 @@ async def create_inspection(
         pathology_type=pathology_type
     )
     db.add(db_inspection)
-    db.commit()
-    db.refresh(db_inspection)
+    db.flush()
     
-    # Save photos
-    if photos:
-        upload_dir = settings.UPLOAD_DIR / "images" / f"inspection_{db_inspection.id}"
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        for idx, photo in enumerate(photos):
-            file_path = upload_dir / f"{code}_img{idx + 1}{Path(photo.filename).suffix}"
-            content = await photo.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+    # Save photos; nothing is committed until all of them are stored, so a
+    # rejected photo (e.g. 413) leaves no inspection behind and a retry can reuse the code
+    upload_dir = settings.UPLOAD_DIR / "images" / f"inspection_{db_inspection.id}"
+    saved_paths = []
+    try:
+        if photos:
+            upload_dir.mkdir(parents=True, exist_ok=True)
             
-            db_photo = InspectionPhoto(
-                inspection_id=db_inspection.id,
-                file_path=str(file_path),
-                file_name=photo.filename,
-                file_size=len(content),
-                mime_type=photo.content_type
-            )
-            db.add(db_photo)
+            for idx, photo in enumerate(photos):
+                file_path = upload_dir / f"{code}_img{idx + 1}{Path(photo.filename).suffix}"
+                saved = await save_upload(photo, file_path)
+                saved_paths.append(file_path)
+                
+                db_photo = InspectionPhoto(
+                    inspection_id=db_inspection.id,
+                    file_path=str(file_path),
+                    file_name=photo.filename,
+                    file_size=saved.size,
+                    mime_type=photo.content_type
+                )
+                db.add(db_photo)
         
+        # Update asset condition
+        if has_pathology and severity:
+            asset.condition_score = severity
+            asset.condition_status = get_condition_status(severity)
+            asset.last_inspection_date = inspection_dt
         db.commit()
+    except BaseException:
+        db.rollback()
+        for file_path in saved_paths:
+            file_path.unlink(missing_ok=True)
+        if upload_dir.is_dir() and not any(upload_dir.iterdir()):
+            upload_dir.rmdir()
+        raise
     
-    # Update asset condition
-    if has_pathology and severity:
-        asset.condition_score = severity
-        asset.condition_status = get_condition_status(severity)
-        asset.last_inspection_date = inspection_dt
-        db.commit()
-    
+    db.refresh(db_inspection)
     return db_inspection
 
 
 @router.get("/", response_model=List[InspectionSchema])
 def list_inspections(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
     asset_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """List all inspections"""
-    query = db.query(Inspection)
+    """List all inspections, newest first (keyset-paginated on date and id, see X-Next-Cursor)"""
+    # The schema includes photos: load them for the whole page in one query
+    query = db.query(Inspection).options(selectinload(Inspection.photos))
     if asset_id:
         query = query.filter(Inspection.asset_id == asset_id)
     
-    inspections = query.order_by(Inspection.inspection_date.desc()).offset(skip).limit(limit).all()
-    return inspections
+    return keyset_page(query, [Inspection.inspection_date, Inspection.id], response, cursor, limit,
+                       descending=True, skip=skip, total=total)
 
 
 @router.get("/{inspection_id}", response_model=InspectionSchema)
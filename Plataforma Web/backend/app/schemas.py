@@ -36,6 +36,18 @@ class Asset(AssetBase):
     condition_status: Optional[str] = None
     condition_score: Optional[int] = None
     last_inspection_date: Optional[datetime] = None
+    location_building: Optional[str] = None
+    location_floor: Optional[str] = None
+    location_room: Optional[str] = None
+    centroid_x: Optional[float] = None
+    centroid_y: Optional[float] = None
+    centroid_z: Optional[float] = None
+    bbox_min_x: Optional[float] = None
+    bbox_min_y: Optional[float] = None
+    bbox_min_z: Optional[float] = None
+    bbox_max_x: Optional[float] = None
+    bbox_max_y: Optional[float] = None
+    bbox_max_z: Optional[float] = None
     created_at: datetime
     updated_at: datetime
     
@@ -43,6 +55,11 @@ class Asset(AssetBase):
         from_attributes = True
 
 
+class AssetDistance(BaseModel):
+    asset: Asset
+    distance: float
+
+
 # IFC File Schemas
 class IFCFileBase(BaseModel):
     filename: str
@@ -57,7 +74,9 @@ class IFCFile(IFCFileBase):
     id: int
     file_path: str
     file_size: Optional[int] = None
+    file_hash: Optional[str] = None
     ifc_schema: Optional[str] = None
+    revision: Optional[int] = None
     processing_status: str
     uploaded_at: datetime
     
@@ -65,6 +84,28 @@ class IFCFile(IFCFileBase):
         from_attributes = True
 
 
+class IngestionJob(BaseModel):
+    id: int
+    status: str
+    attempts: int
+    max_attempts: int
+    progress_done: int
+    progress_total: Optional[int] = None
+    rate: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class IFCFileDetail(IFCFile):
+    processing_error: Optional[str] = None
+    job: Optional[IngestionJob] = None  # latest ingestion job, with live progress
+
+
 # Inspection Schemas
 class InspectionPhotoBase(BaseModel):
     file_name: str
@@ -127,6 +168,26 @@ class AIAnalysisResult(BaseModel):
     mask_path: Optional[str] = None
     heatmap_path: Optional[str] = None
     result_path: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None  # seconds per pipeline stage
+
+
+class AIDetection(BaseModel):
+    id: int
+    inspection_id: Optional[int] = None
+    photo_id: Optional[int] = None
+    image_path: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    confidence: Optional[float] = None
+    threshold: Optional[float] = None
+    region_count: int = 0
+    total_area: float = 0.0
+    regions: List[Dict[str, Any]] = []
+    mask_rle: Optional[Dict[str, Any]] = None  # {"size": [h, w], "counts": str} when requested
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
 
 
 # Blender Sync Schemas
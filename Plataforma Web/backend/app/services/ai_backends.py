@@ -0,0 +1,122 @@
+"""
+CPU inference backends for the SwinDeepLab model
+AI_BACKEND selects how the checkpoint is run:
+    torch        eager fp32 PyTorch (default)
+    int8         eager PyTorch with Linear layers dynamically quantized to int8
+    torchscript  traced TorchScript module exported by export_model.py
+    onnx         ONNX Runtime session on the model exported by export_model.py
+Every backend is called like the eager model (NCHW float tensor in, logits out),
+so the rest of the AI service does not depend on the choice.
+Also holds the mask helpers shared by export_model.py's accuracy check and
+the AI benchmarks.
+"""
+import inspect
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import torch
+
+BACKENDS = ("torch", "int8", "torchscript", "onnx")
+EXPORT_SUFFIXES = {"torchscript": ".torchscript.pt", "onnx": ".onnx"}
+
+
+class OnnxModel:
+    """ONNX Runtime session with the eager model's call signature"""
+
+    def __init__(self, path: str, threads: int = 0):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("onnxruntime is not installed (required for AI_BACKEND=onnx)")
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(None, {self.input_name: tensor.detach().cpu().numpy().astype(np.float32, copy=False)})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+
+def validate_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown AI backend {backend!r}; expected one of {list(BACKENDS)}")
+    return backend
+
+
+def export_path(checkpoint: Path, backend: str, export_dir: Optional[Path] = None) -> Path:
+    """Where export_model.py writes (and the service reads) the exported model"""
+    directory = Path(export_dir) if export_dir else checkpoint.parent
+    return directory / f"{checkpoint.stem}{EXPORT_SUFFIXES[backend]}"
+
+
+def backend_device(backend: str, device: str) -> str:
+    """Quantized and ONNX backends run on CPU only"""
+    return device if backend in ("torch", "torchscript") else "cpu"
+
+
+def load_backend(path: str, device: str, backend: str, load_eager: Callable[[str, str], torch.nn.Module],
+                 onnx_threads: int = 0):
+    """
+    Model for backend: path is the checkpoint for torch/int8 and the exported
+    file for torchscript/onnx
+    """
+    validate_backend(backend)
+    if backend == "torch":
+        return load_eager(path, device)
+    if backend == "int8":
+        return quantize_int8(load_eager(path, "cpu"))
+    if backend == "torchscript":
+        return torch.jit.load(path, map_location=device).eval()
+    return OnnxModel(path, onnx_threads)
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic int8 quantization of Linear layers (Swin attention and MLP blocks)"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8).eval()
+
+
+def export_torchscript(model: torch.nn.Module, path: Path, image_size: int) -> Path:
+    example = torch.zeros(1, 3, image_size, image_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model.cpu().eval(), example)
+    traced.save(str(path))
+    return path
+
+
+def export_onnx(model: torch.nn.Module, path: Path, image_size: int, opset: int = 17) -> Path:
+    """ONNX export with a dynamic batch dimension"""
+    example = torch.zeros(1, 3, image_size, image_size)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # TorchScript-based exporter: dynamic_axes, no onnxscript dependency
+    torch.onnx.export(
+        model.cpu().eval(), (example,), str(path),
+        input_names=["input"], output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=opset, do_constant_folding=True, **kwargs,
+    )
+    return path
+
+
+def mask_iou(a: np.ndarray, b: np.ndarray) -> float:
+    """Intersection over union of two boolean masks (1.0 when both are empty)"""
+    union = np.logical_or(a, b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def predict_masks(model, tensors: List[torch.Tensor], batch_size: int, threshold: float) -> np.ndarray:
+    """Boolean masks (n, H, W) of model for preprocessed tensors, batch_size at a time"""
+    masks = []
+    with torch.no_grad():
+        for start in range(0, len(tensors), batch_size):
+            logits = model(torch.stack(tensors[start:start + batch_size]))
+            masks.append((torch.sigmoid(logits)[:, 0] > threshold).numpy())
+    return np.concatenate(masks)
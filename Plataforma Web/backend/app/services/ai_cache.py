@@ -0,0 +1,80 @@
+"""
+Content-addressed cache of AI analysis results
+Keyed by the image's SHA-256, the model checkpoint's SHA-256, the input size,
+the threshold, the inference mode and the region (polygon) settings, so
+re-submitted photos are answered without running the model. Entries hold the
+probability map quantized to uint8 (compressed .npz) plus the detection
+(confidence, regions, artifact paths).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.disk_cache import DiskCache
+from app.services.ifc_cache import sha256_file
+
+_model_hashes: Dict[Tuple[str, int, int], str] = {}
+_result_cache: Optional["AIResultCache"] = None
+
+
+def model_fingerprint(model_path: Path) -> str:
+    """SHA-256 of the checkpoint, hashed once per (path, size, mtime)"""
+    stat = os.stat(model_path)
+    stat_key = (str(Path(model_path).resolve()), stat.st_size, stat.st_mtime_ns)
+    if stat_key not in _model_hashes:
+        _model_hashes[stat_key] = sha256_file(str(model_path))
+    return _model_hashes[stat_key]
+
+
+def inference_variant(settings) -> str:
+    """Settings besides size and threshold that change the cached result (probability map or regions)"""
+    if settings.AI_TILED_ENABLED:
+        mode = f"tiled{settings.AI_TILE_OVERLAP}-{settings.AI_MAX_TILES}-{settings.AI_TILE_MIN_STD:g}"
+    else:
+        mode = "resize"
+    regions = f"poly{settings.AI_POLYGON_EPSILON:g}-{settings.AI_MIN_REGION_AREA}"
+    return f"{settings.AI_BACKEND}-{mode}-{regions}"
+
+
+class AIResultCache:
+    """Compressed probability maps and detections with LRU eviction"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.cache = DiskCache(directory, max_bytes, suffix=".npz")
+
+    @staticmethod
+    def key(image_hash: str, model_hash: str, image_size: int, threshold: float, variant: str) -> str:
+        params = f"{model_hash}-{image_size}-{threshold:g}-{variant}"
+        return f"{image_hash}-{hashlib.sha256(params.encode()).hexdigest()[:16]}"
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """(probability map as float32, detection) on a hit, None on a miss or unreadable entry"""
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        try:
+            with np.load(path) as entry:
+                prob = entry["prob"].astype(np.float32) / 255
+                detection = json.loads(entry["detection"].tobytes().decode("utf-8"))
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+            return None
+        return prob, detection
+
+    def save(self, key: str, prob: np.ndarray, detection: Dict[str, Any]):
+        quantized = np.clip(np.rint(prob * 255), 0, 255).astype(np.uint8)
+        payload = np.frombuffer(json.dumps(detection).encode("utf-8"), dtype=np.uint8)
+        with self.cache.store(key) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, prob=quantized, detection=payload)
+
+
+def get_result_cache(settings) -> AIResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = AIResultCache(settings.AI_CACHE_DIR, settings.AI_CACHE_MAX_BYTES)
+    return _result_cache
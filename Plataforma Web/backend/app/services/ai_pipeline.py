@@ -0,0 +1,108 @@
+"""
+Prefetching preprocessing pipeline
+Worker threads decode, resize and normalize upcoming images straight into
+preallocated float32 batch buffers while the model runs on the current batch.
+Up to AI_PREFETCH_BATCHES batches are in flight, so once the pipeline is
+primed the forward pass does not wait on JPEG decoding.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# ImageNet statistics, as albumentations Normalize() defaults
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+_SCALE = (1.0 / (255.0 * STD)).reshape(3, 1, 1)
+_OFFSET = (MEAN / STD).reshape(3, 1, 1)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_preprocess_executor(settings) -> ThreadPoolExecutor:
+    """Process-wide pool of AI_PREFETCH_WORKERS decoding threads"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.AI_PREFETCH_WORKERS),
+                                           thread_name_prefix="ai-preprocess")
+        return _executor
+
+
+def normalize_into(image_rgb: np.ndarray, out: np.ndarray):
+    """Write the normalized (3, H, W) float32 model input of an (H, W, 3) uint8 image into out"""
+    np.multiply(image_rgb.transpose(2, 0, 1), _SCALE, out=out, casting="unsafe")
+    np.subtract(out, _OFFSET, out=out)
+
+
+class PrefetchPipeline:
+    """Iterates (paths, original images, (n, 3, S, S) float32 batch) over image_paths"""
+
+    def __init__(self, image_paths: List[str], image_size: int, batch_size: int,
+                 executor: ThreadPoolExecutor, depth: int = 2):
+        self.image_paths = image_paths
+        self.image_size = image_size
+        self.batch_size = max(1, batch_size)
+        self.executor = executor
+        self.depth = max(1, depth)
+        self.timings: Dict[str, float] = {"decode": 0.0, "normalize": 0.0, "prefetch_wait": 0.0}
+        self._timings_lock = threading.Lock()
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        for _ in range(self.depth):
+            self._free.put(np.empty((self.batch_size, 3, image_size, image_size), dtype=np.float32))
+
+    def __iter__(self) -> Iterator[Tuple[List[str], List[np.ndarray], np.ndarray]]:
+        chunks = iter([self.image_paths[i:i + self.batch_size]
+                       for i in range(0, len(self.image_paths), self.batch_size)])
+        pending = deque()
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                buffer = self._free.get_nowait()
+                futures = [self.executor.submit(self._load, path, buffer, slot) for slot, path in enumerate(chunk)]
+                pending.append((chunk, buffer, futures))
+
+        for _ in range(self.depth):
+            submit_next()
+        while pending:
+            chunk, buffer, futures = pending.popleft()
+            started = time.perf_counter()
+            images = [future.result() for future in futures]
+            self.timings["prefetch_wait"] += time.perf_counter() - started
+
+            # Unreadable images leave gaps; move the loaded slots to the front
+            paths, originals = [], []
+            for slot, (path, img) in enumerate(zip(chunk, images)):
+                if img is None:
+                    continue
+                if slot != len(paths):
+                    buffer[len(paths)] = buffer[slot]
+                paths.append(path)
+                originals.append(img)
+            if paths:
+                yield paths, originals, buffer[:len(paths)]
+            # The consumer is done with the buffer once it asks for the next batch
+            self._free.put(buffer)
+            submit_next()
+
+    def _load(self, path: str, buffer: np.ndarray, slot: int) -> Optional[np.ndarray]:
+        started = time.perf_counter()
+        img = cv2.imread(path)
+        if img is None:
+            return None
+        image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        image_resized = cv2.resize(image_rgb, (self.image_size, self.image_size))
+        decoded = time.perf_counter()
+        normalize_into(image_resized, buffer[slot])
+        finished = time.perf_counter()
+        with self._timings_lock:
+            self.timings["decode"] += decoded - started
+            self.timings["normalize"] += finished - decoded
+        return img
@@ -2,16 +2,28 @@
 AI Service for image analysis using SwinDeepLab model
 Adapted from the existing analisar_rede.py
 """
+import asyncio
+import functools
 import os
 import sys
+import time
 import cv2
 import torch
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 from albumentations.pytorch import ToTensorV2
 from albumentations import Normalize, Compose
 
+from app.services.ai_backends import backend_device, export_path, load_backend, validate_backend
+from app.services.ai_cache import AIResultCache, get_result_cache, inference_variant, model_fingerprint
+from app.services.ai_pipeline import PrefetchPipeline, get_preprocess_executor
+from app.services.ai_tiling import TiledImage
+from app.services.artifact_writer import ARTIFACTS, ArtifactWriter
+from app.services.inference_pool import apply_thread_budget
+from app.services.ifc_cache import sha256_file
+from app.services.model_registry import ModelRegistry
+
 # Add parent directory to path to import swin_model
 sys.path.append(str(Path(__file__).parent.parent.parent.parent / "PonteInspecao.lib"))
 
@@ -21,106 +33,306 @@ except ImportError:
     SwinDeepLab = None
     print("Warning: SwinDeepLab model not found. AI analysis will not work.")
 
+_model_registry: Optional[ModelRegistry] = None
+
 
-def analyze_image_with_ai(image_paths: List[str], settings) -> Dict[str, Any]:
+def analyze_image_with_ai(image_paths: List[str], settings,
+                          artifacts: Optional[Iterable[str]] = None) -> Dict[str, Any]:
     """
     Analyze images using SwinDeepLab model
-    Returns detection results with masks and heatmaps
+    Returns detection results with the requested artifacts (default AI_ARTIFACTS)
     """
-    if SwinDeepLab is None:
-        raise ImportError("SwinDeepLab model not available")
+    # Create output directory
+    writer = ArtifactWriter(settings, results_dir(settings), artifacts)
     
-    # Load model
-    model_path = Path(settings.AI_MODEL_PATH)
-    if not model_path.exists():
-        # Try relative path
-        model_path = Path(__file__).parent.parent.parent.parent / "PonteInspecao.lib" / "best_deeplab_lr0.0001_bs4_fold2.pth"
+    # Re-submitted images are answered from the result cache
+    keys = cache_keys(image_paths, settings)
+    hits = {}
+    for img_path in image_paths:
+        if img_path in keys and img_path not in hits:
+            detection = cached_detection(img_path, keys[img_path], settings, writer)
+            if detection is not None:
+                hits[img_path] = detection
+    misses = [img_path for img_path in image_paths if img_path not in hits]
     
-    if not model_path.exists():
-        raise FileNotFoundError(f"Model not found at {model_path}")
+    futures = {}
+    timings: Dict[str, float] = {}
+    if misses:
+        # Loaded once per process and reused across requests
+        model, device = get_model(settings)
+        
+        # Process images; artifacts are encoded while the next batch runs
+        predictions = iter_predictions(model, device, misses, settings, val_transform(), timings)
+        for img_path, img, prob, detected in predictions:
+            futures[img_path] = writer.submit(img_path, img, prob, detected, result_saver(keys.get(img_path), settings))
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model, _ = load_model(str(model_path), device)
+    detections = [
+        hits[img_path] if img_path in hits else futures[img_path].result()
+        for img_path in image_paths
+        if img_path in hits or img_path in futures
+    ]
+    if futures:
+        for stage, seconds in writer.timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+    return {**summarize_detections(detections), "timings": timings or None}
+
+
+async def analyze_images_async(image_paths: List[str], settings,
+                               artifacts: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    analyze_image_with_ai for async endpoints: decoding and artifact writing run
+    in worker threads and inference goes through the shared micro-batching
+    InferenceServer, so concurrent requests are batched together and the
+    event loop is never blocked. At most AI_MAX_BATCH images of the request are
+    in progress at once, so only that many decoded originals are held in memory.
+    """
+    from app.services.inference_server import get_inference_server
+    server = get_inference_server(settings)
+    writer = ArtifactWriter(settings, results_dir(settings), artifacts)
+    transform = val_transform()
+    keys = await asyncio.to_thread(cache_keys, image_paths, settings)
+    in_progress = asyncio.Semaphore(max(1, settings.AI_MAX_BATCH))
     
-    # Create output directory
-    output_dir = Path(settings.UPLOAD_DIR) / "results" / "ai_analysis"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    async def analyze_one(img_path: str) -> Optional[Dict[str, Any]]:
+        async with in_progress:
+            return await analyze_image(img_path)
     
-    # Process images
-    detections = []
-    all_confidences = []
+    async def analyze_image(img_path: str) -> Optional[Dict[str, Any]]:
+        if img_path in keys:
+            detection = await asyncio.to_thread(cached_detection, img_path, keys[img_path], settings, writer)
+            if detection is not None:
+                return detection
+        
+        if settings.AI_TILED_ENABLED:
+            img = await asyncio.to_thread(cv2.imread, img_path)
+            if img is None:
+                return None
+            tiles = await asyncio.to_thread(TiledImage, img, settings, transform)
+            probs = await asyncio.gather(*(server.predict(tensor) for tensor in tiles.tensors))
+            prob = await asyncio.to_thread(tiles.stitch, probs)
+        else:
+            loaded = await asyncio.to_thread(preprocess_image, img_path, settings, transform)
+            if loaded is None:
+                return None
+            img, tensor = loaded
+            prob = await server.predict(tensor)
+        detected = prob > settings.AI_THRESHOLD
+        return await asyncio.wrap_future(writer.executor.submit(
+            writer.write, img_path, img, prob, detected, result_saver(keys.get(img_path), settings)
+        ))
     
-    val_transform = Compose([
-        Normalize(),
-        ToTensorV2()
-    ])
+    results = await asyncio.gather(*(analyze_one(img_path) for img_path in image_paths))
+    return summarize_detections([detection for detection in results if detection is not None])
+
+
+def cache_keys(image_paths: List[str], settings) -> Dict[str, str]:
+    """Result cache key per readable image path; empty when AI_CACHE_ENABLED is off"""
+    if not settings.AI_CACHE_ENABLED:
+        return {}
+    model_hash = model_fingerprint(resolve_model_path(settings))
+    variant = inference_variant(settings)
+    return {
+        img_path: AIResultCache.key(sha256_file(img_path), model_hash, settings.AI_IMAGE_SIZE,
+                                    settings.AI_THRESHOLD, variant)
+        for img_path in image_paths
+        if os.path.isfile(img_path)
+    }
+
+
+def cached_detection(img_path: str, key: str, settings, writer: ArtifactWriter) -> Optional[Dict[str, Any]]:
+    """
+    Detection for a cached image. Requested artifacts that were not produced
+    before (or were deleted) are rendered from the stored probability map.
+    """
+    cache = get_result_cache(settings)
+    entry = cache.load(key)
+    if entry is None:
+        return None
+    prob, detection = entry
+    if "regions" not in detection:
+        return None  # stored before polygons existed
     
-    for img_path in image_paths:
-        # Load image
+    missing = [name for name in writer.artifacts
+               if not detection.get(f"{name}_path") or not os.path.exists(detection[f"{name}_path"])]
+    if missing:
         img = cv2.imread(img_path)
         if img is None:
-            continue
-        
-        # Preprocess
-        image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        image_resized = cv2.resize(image_rgb, (settings.AI_IMAGE_SIZE, settings.AI_IMAGE_SIZE))
-        tensor = val_transform(image=image_resized)['image'].unsqueeze(0).to(device)
-        
-        # Inference
-        with torch.no_grad():
-            pred = model(tensor)
-            prob = torch.sigmoid(pred)[0, 0].cpu().numpy()
-        
-        # Calculate confidence (percentage of pixels above threshold)
-        confidence = float(np.mean(prob > settings.AI_THRESHOLD))
-        all_confidences.append(confidence)
-        
-        # Create mask
-        mask = (prob > settings.AI_THRESHOLD).astype(np.uint8) * 255
-        mask_resized = cv2.resize(mask, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_NEAREST)
-        
-        # Create heatmap
-        prob_map = (prob * 255).astype(np.uint8)
-        prob_resized = cv2.resize(prob_map, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_NEAREST)
-        heatmap = cv2.applyColorMap(prob_resized, cv2.COLORMAP_JET)
-        
-        # Save results
-        img_name = Path(img_path).stem
-        mask_path = output_dir / f"mask_{img_name}.png"
-        heatmap_path = output_dir / f"heatmap_{img_name}.png"
-        
-        cv2.imwrite(str(mask_path), mask_resized)
-        cv2.imwrite(str(heatmap_path), heatmap)
-        
-        # Draw contours on original
-        result_img = img.copy()
-        contours, _ = cv2.findContours(mask_resized, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        cv2.drawContours(result_img, contours, -1, (0, 0, 255), 2)
-        
-        result_path = output_dir / f"result_{img_name}.jpg"
-        cv2.imwrite(str(result_path), result_img)
-        
-        detections.append({
-            "image_path": img_path,
-            "confidence": confidence,
-            "has_detection": confidence > 0.1,  # At least 10% of pixels detected
-            "mask_path": str(mask_path),
-            "heatmap_path": str(heatmap_path),
-            "result_path": str(result_path)
-        })
+            return None
+        written = writer.write(img_path, img, prob, prob > settings.AI_THRESHOLD)
+        for name in missing:
+            detection[f"{name}_path"] = written[f"{name}_path"]
+        save_result(cache, key, prob, detection)
     
-    avg_confidence = np.mean(all_confidences) if all_confidences else 0.0
+    detection = {**detection, "image_path": img_path, "cached": True}
+    for name in ARTIFACTS:
+        if name not in writer.artifacts:
+            detection[f"{name}_path"] = None
+    return detection
+
+
+def result_saver(key: Optional[str], settings):
+    """ArtifactWriter callback storing a fresh result under key (None: not cached)"""
+    if key is None:
+        return None
+    return functools.partial(save_result, get_result_cache(settings), key)
+
+
+def save_result(cache: AIResultCache, key: str, prob: np.ndarray, detection: Dict[str, Any]):
+    try:
+        cache.save(key, prob, detection)
+    except OSError as e:
+        print(f"Warning: could not cache AI result: {e}")
+
+
+def val_transform():
+    return Compose([
+        Normalize(),
+        ToTensorV2()
+    ])
+
+
+def results_dir(settings) -> Path:
+    output_dir = Path(settings.UPLOAD_DIR) / "results" / "ai_analysis"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+
+def summarize_detections(detections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Analysis result for a list of per-image detections"""
+    avg_confidence = np.mean([d["confidence"] for d in detections]) if detections else 0.0
     
     return {
         "success": True,
         "detections": detections,
         "confidence": float(avg_confidence),
-        "mask_path": str(detections[0]["mask_path"]) if detections else None,
-        "heatmap_path": str(detections[0]["heatmap_path"]) if detections else None,
-        "result_path": str(detections[0]["result_path"]) if detections else None
+        "mask_path": detections[0]["mask_path"] if detections else None,
+        "heatmap_path": detections[0]["heatmap_path"] if detections else None,
+        "result_path": detections[0]["result_path"] if detections else None
     }
 
 
+def iter_predictions(model, device: str, image_paths: List[str], settings, transform,
+                     timings: Optional[Dict[str, float]] = None):
+    """
+    Yield (path, original image, probability map, thresholded mask) per readable image.
+    Images are decoded ahead by the PrefetchPipeline into batches of
+    AI_BATCH_SIZE so each batch is one forward pass, with sigmoid and
+    threshold applied to the whole batch. Per-stage seconds (decode,
+    normalize, prefetch_wait, inference, postprocess) are added to timings
+    when given.
+    """
+    batch_size = max(1, settings.AI_BATCH_SIZE)
+    if settings.AI_TILED_ENABLED:
+        yield from iter_tiled_predictions(model, device, image_paths, settings, transform)
+        return
+    
+    pipeline = PrefetchPipeline(image_paths, settings.AI_IMAGE_SIZE, batch_size,
+                                get_preprocess_executor(settings), settings.AI_PREFETCH_BATCHES)
+    inference = postprocess = 0.0
+    try:
+        for paths, images, batch in pipeline:
+            started = time.perf_counter()
+            probs = predict_tensor(model, device, torch.from_numpy(batch))
+            predicted = time.perf_counter()
+            detected = probs > settings.AI_THRESHOLD
+            inference += predicted - started
+            postprocess += time.perf_counter() - predicted
+            
+            for img_path, img, prob, mask in zip(paths, images, probs, detected):
+                yield img_path, img, prob, mask
+    finally:
+        if timings is not None:
+            timings.update(pipeline.timings, inference=inference, postprocess=postprocess)
+
+
+def iter_tiled_predictions(model, device: str, image_paths: List[str], settings, transform):
+    """
+    iter_predictions for AI_TILED_ENABLED: each image's tiles are run in batches
+    of AI_BATCH_SIZE and stitched into a full-resolution probability map
+    """
+    batch_size = max(1, settings.AI_BATCH_SIZE)
+    for img_path in image_paths:
+        img = cv2.imread(img_path)
+        if img is None:
+            continue
+        tiles = TiledImage(img, settings, transform)
+        probs = []
+        for start in range(0, len(tiles.tensors), batch_size):
+            probs.extend(predict_batch(model, device, tiles.tensors[start:start + batch_size]))
+        prob = tiles.stitch(probs)
+        yield img_path, img, prob, prob > settings.AI_THRESHOLD
+
+
+def preprocess_image(img_path: str, settings, transform) -> Optional[Tuple[np.ndarray, torch.Tensor]]:
+    """(original BGR image, model input tensor), or None if the file is not a readable image"""
+    # Load image
+    img = cv2.imread(img_path)
+    if img is None:
+        return None
+    
+    # Preprocess
+    image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    image_resized = cv2.resize(image_rgb, (settings.AI_IMAGE_SIZE, settings.AI_IMAGE_SIZE))
+    return img, transform(image=image_resized)['image']
+
+
+def predict_batch(model, device: str, tensors: List[torch.Tensor]) -> np.ndarray:
+    """Probability maps (n, H, W) for a list of input tensors, in one forward pass"""
+    return predict_tensor(model, device, torch.stack(tensors))
+
+
+def predict_tensor(model, device: str, batch: torch.Tensor) -> np.ndarray:
+    """Probability maps (n, H, W) for an (n, C, H, W) input batch"""
+    with torch.no_grad():
+        return torch.sigmoid(model(batch.to(device)))[:, 0].cpu().numpy()
+
+
+def resolve_model_path(settings) -> Path:
+    """Configured checkpoint path, falling back to the PonteInspecao.lib copy"""
+    model_path = Path(settings.AI_MODEL_PATH)
+    if not model_path.exists():
+        # Try relative path
+        model_path = Path(__file__).parent.parent.parent.parent / "PonteInspecao.lib" / "best_deeplab_lr0.0001_bs4_fold2.pth"
+    
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found at {model_path}")
+    return model_path
+
+
+def get_model_registry(settings) -> ModelRegistry:
+    """Process-wide model registry (AI_MODEL_CACHE_SIZE checkpoints kept loaded)"""
+    global _model_registry
+    if _model_registry is None:
+        if settings.AI_TORCH_THREADS > 0:
+            apply_thread_budget(settings.AI_TORCH_THREADS)
+        _model_registry = ModelRegistry(
+            lambda path, device, backend: load_backend(path, device, backend, lambda p, d: load_model(p, d)[0],
+                                                       settings.AI_ONNX_THREADS),
+            settings.AI_MODEL_CACHE_SIZE,
+        )
+    return _model_registry
+
+
+def get_model(settings, reload: bool = False) -> Tuple[Any, str]:
+    """Warm SwinDeepLab model for the configured checkpoint, AI_BACKEND and device"""
+    backend = validate_backend(settings.AI_BACKEND)
+    if SwinDeepLab is None and backend in ("torch", "int8"):
+        raise ImportError("SwinDeepLab model not available")
+    
+    model_path = resolve_model_path(settings)
+    if backend in ("torchscript", "onnx"):
+        model_path = export_path(model_path, backend, settings.AI_EXPORT_DIR)
+        if not model_path.exists():
+            raise FileNotFoundError(f"Exported model not found at {model_path} (run export_model.py)")
+    device = backend_device(backend, "cuda" if torch.cuda.is_available() else "cpu")
+    registry = get_model_registry(settings)
+    if reload:
+        model = registry.reload(str(model_path), device, backend)
+    else:
+        model = registry.get(str(model_path), device, backend)
+    return model, device
+
+
 def load_model(model_path: str, device: str):
     """Load SwinDeepLab model"""
     checkpoint = torch.load(model_path, map_location=device)
@@ -0,0 +1,123 @@
+"""
+Tiled high-resolution inference
+Large photos are cut into overlapping AI_IMAGE_SIZE tiles instead of being
+shrunk to a single input, so thin cracks survive. Tile probabilities are
+blended with a linear ramp in the overlaps and stitched into a full-size map.
+Near-uniform tiles (sky, background) are skipped by a variance test.
+"""
+import math
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+
+class TiledImage:
+    """Model inputs for one image and the stitching of their predictions"""
+
+    def __init__(self, img: np.ndarray, settings, transform):
+        self.height, self.width = img.shape[:2]
+        self.tile = settings.AI_IMAGE_SIZE
+        image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+        self.tiled = max(self.height, self.width) > self.tile
+        if not self.tiled:
+            # Small images keep the single resized pass
+            resized = cv2.resize(image_rgb, (self.tile, self.tile))
+            self.origins: List[Tuple[int, int]] = []
+            self.tensors: List[torch.Tensor] = [transform(image=resized)['image']]
+            return
+
+        self.overlap = min(max(0, settings.AI_TILE_OVERLAP), self.tile // 2)
+        self.scale = tile_scale(self.height, self.width, self.tile, self.overlap, settings.AI_MAX_TILES)
+        if self.scale < 1.0:
+            image_rgb = cv2.resize(image_rgb, (max(1, round(self.width * self.scale)),
+                                               max(1, round(self.height * self.scale))),
+                                   interpolation=cv2.INTER_AREA)
+        self.scaled_shape = image_rgb.shape[:2]
+
+        # Pad sides shorter than a tile so every tile is full size
+        pad_y = max(0, self.tile - self.scaled_shape[0])
+        pad_x = max(0, self.tile - self.scaled_shape[1])
+        if pad_y or pad_x:
+            image_rgb = cv2.copyMakeBorder(image_rgb, 0, pad_y, 0, pad_x, cv2.BORDER_REFLECT_101)
+
+        gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+        self.origins = []
+        self.tensors = []
+        self.skipped = 0
+        for y in tile_positions(image_rgb.shape[0], self.tile, self.overlap):
+            for x in tile_positions(image_rgb.shape[1], self.tile, self.overlap):
+                if is_blank(gray[y:y + self.tile, x:x + self.tile], settings.AI_TILE_MIN_STD):
+                    self.skipped += 1
+                    continue
+                self.origins.append((y, x))
+                self.tensors.append(transform(image=image_rgb[y:y + self.tile, x:x + self.tile])['image'])
+
+    def stitch(self, probs) -> np.ndarray:
+        """
+        Probability map for the image from one prediction per tensor.
+        Tiled images get a map at the original resolution; skipped tiles read as 0.
+        """
+        if not self.tiled:
+            return probs[0]
+
+        rows = max(self.tile, self.scaled_shape[0])
+        cols = max(self.tile, self.scaled_shape[1])
+        total = np.zeros((rows, cols), dtype=np.float32)
+        weight = np.zeros((rows, cols), dtype=np.float32)
+        window = blend_window(self.tile, self.overlap)
+        for (y, x), prob in zip(self.origins, probs):
+            total[y:y + self.tile, x:x + self.tile] += prob * window
+            weight[y:y + self.tile, x:x + self.tile] += window
+        np.divide(total, weight, out=total, where=weight > 0)
+
+        prob = total[:self.scaled_shape[0], :self.scaled_shape[1]]
+        if self.scale < 1.0:
+            prob = cv2.resize(prob, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        return prob
+
+
+def tile_positions(length: int, tile: int, overlap: int) -> List[int]:
+    """Tile origins along one axis; the last tile is aligned to the far edge"""
+    if length <= tile:
+        return [0]
+    stride = tile - overlap
+    positions = list(range(0, length - tile, stride))
+    positions.append(length - tile)
+    return positions
+
+
+def tile_count(height: int, width: int, tile: int, overlap: int) -> int:
+    return len(tile_positions(height, tile, overlap)) * len(tile_positions(width, tile, overlap))
+
+
+def tile_scale(height: int, width: int, tile: int, overlap: int, max_tiles: int) -> float:
+    """Largest downscale factor <= 1 that keeps the grid within max_tiles"""
+    max_tiles = max(1, max_tiles)
+    count = tile_count(height, width, tile, overlap)
+    if count <= max_tiles:
+        return 1.0
+    scale = math.sqrt(max_tiles / count)
+    while tile_count(round(height * scale), round(width * scale), tile, overlap) > max_tiles:
+        scale *= 0.95
+    return scale
+
+
+def blend_window(tile: int, overlap: int) -> np.ndarray:
+    """(tile, tile) weights ramping linearly across the overlap, never zero"""
+    if overlap <= 0:
+        return np.ones((tile, tile), dtype=np.float32)
+    centres = np.arange(tile, dtype=np.float32) + 0.5
+    ramp = np.minimum(1.0, np.minimum(centres, tile - centres) / overlap)
+    ramp = np.maximum(ramp, 1e-3)
+    return np.outer(ramp, ramp).astype(np.float32)
+
+
+def is_blank(gray_tile: np.ndarray, min_std: Optional[float]) -> bool:
+    """Near-uniform tile (grey level standard deviation below min_std)"""
+    if not min_std:
+        return False
+    _, std = cv2.meanStdDev(gray_tile)
+    return float(std[0, 0]) < min_std
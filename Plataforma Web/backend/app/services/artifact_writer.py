@@ -0,0 +1,136 @@
+"""
+AI artifact writer
+Encodes the mask, heatmap and contour overlay of each analyzed image on a
+thread pool, so PNG/JPEG encoding overlaps with inference of the next batch.
+Only the requested artifacts are produced and every analysis gets unique
+file names.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.mask_encoding import mask_regions, rle_encode
+
+ARTIFACTS = ("mask", "heatmap", "result")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_artifact_executor(settings) -> ThreadPoolExecutor:
+    """Process-wide pool of AI_ARTIFACT_WORKERS encoding threads"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.AI_ARTIFACT_WORKERS),
+                                           thread_name_prefix="ai-artifacts")
+        return _executor
+
+
+def parse_artifacts(value: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Validated artifact names from a list or comma-separated string"""
+    if value is None:
+        return ARTIFACTS
+    if isinstance(value, str):
+        value = value.split(",")
+    names = tuple(dict.fromkeys(name.strip().lower() for name in value if name.strip()))
+    unknown = [name for name in names if name not in ARTIFACTS]
+    if unknown:
+        raise ValueError(f"Unknown artifacts {unknown}; expected some of {list(ARTIFACTS)}")
+    return names
+
+
+def unique_stem(path: str) -> str:
+    """File stem plus a random suffix, so re-analysing a same-named file keeps earlier results"""
+    return f"{Path(path).stem}_{uuid.uuid4().hex[:12]}"
+
+
+class ArtifactWriter:
+    """Writes the selected artifacts of one analysis into output_dir"""
+
+    def __init__(self, settings, output_dir: Path, artifacts: Optional[Iterable[str]] = None):
+        self.output_dir = output_dir
+        self.artifacts = parse_artifacts(artifacts if artifacts is not None else settings.AI_ARTIFACTS)
+        self.png_params = [cv2.IMWRITE_PNG_COMPRESSION, settings.AI_PNG_COMPRESSION]
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, settings.AI_JPEG_QUALITY]
+        self.polygon_epsilon = settings.AI_POLYGON_EPSILON
+        self.min_region_area = settings.AI_MIN_REGION_AREA
+        self.executor = get_artifact_executor(settings)
+        # Bounds decoded images held by queued writes in the sync pipeline
+        self._pending = threading.BoundedSemaphore(max(1, settings.AI_ARTIFACT_WORKERS) * 2)
+        # Seconds spent in writer threads: image encoding vs. RLE/polygon extraction
+        self.timings: Dict[str, float] = {"artifact_write": 0.0, "postprocess": 0.0}
+        self._timings_lock = threading.Lock()
+
+    def submit(self, img_path: str, img: np.ndarray, prob: np.ndarray, detected: np.ndarray,
+               after: Optional[Callable[[np.ndarray, Dict[str, Any]], None]] = None) -> "Future[Dict[str, Any]]":
+        """Queue the writes for one prediction, blocking while too many are pending"""
+        self._pending.acquire()
+        try:
+            future = self.executor.submit(self.write, img_path, img, prob, detected, after)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def write(self, img_path: str, img: np.ndarray, prob: np.ndarray, detected: np.ndarray,
+              after: Optional[Callable[[np.ndarray, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Write the artifacts for one prediction and describe them; after(prob, detection) runs last"""
+        started = time.perf_counter()
+        # Calculate confidence (percentage of pixels above threshold)
+        confidence = float(np.mean(detected))
+        stem = unique_stem(img_path)
+        height, width = img.shape[:2]
+        paths: Dict[str, Optional[str]] = {"mask_path": None, "heatmap_path": None, "result_path": None}
+
+        if "mask" in self.artifacts or "result" in self.artifacts:
+            mask = detected.astype(np.uint8) * 255
+            mask_resized = cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST)
+            if "mask" in self.artifacts:
+                mask_path = self.output_dir / f"mask_{stem}.png"
+                cv2.imwrite(str(mask_path), mask_resized, self.png_params)
+                paths["mask_path"] = str(mask_path)
+            if "result" in self.artifacts:
+                # Draw contours on original
+                result_img = img.copy()
+                contours, _ = cv2.findContours(mask_resized, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                cv2.drawContours(result_img, contours, -1, (0, 0, 255), 2)
+                result_path = self.output_dir / f"result_{stem}.jpg"
+                cv2.imwrite(str(result_path), result_img, self.jpeg_params)
+                paths["result_path"] = str(result_path)
+
+        if "heatmap" in self.artifacts:
+            prob_map = (prob * 255).astype(np.uint8)
+            prob_resized = cv2.resize(prob_map, (width, height), interpolation=cv2.INTER_NEAREST)
+            heatmap = cv2.applyColorMap(prob_resized, cv2.COLORMAP_JET)
+            heatmap_path = self.output_dir / f"heatmap_{stem}.png"
+            cv2.imwrite(str(heatmap_path), heatmap, self.png_params)
+            paths["heatmap_path"] = str(heatmap_path)
+
+        written = time.perf_counter()
+        # Compact mask and overlay polygons, always produced
+        mask_height, mask_width = detected.shape
+        detection = {
+            "image_path": img_path,
+            "confidence": confidence,
+            "has_detection": confidence > 0.1,  # At least 10% of pixels detected
+            **paths,
+            "width": width,
+            "height": height,
+            "mask_rle": {"size": [mask_height, mask_width], "counts": rle_encode(detected)},
+            "regions": mask_regions(detected, width / mask_width, height / mask_height,
+                                    self.polygon_epsilon, self.min_region_area),
+        }
+        with self._timings_lock:
+            self.timings["artifact_write"] += written - started
+            self.timings["postprocess"] += time.perf_counter() - written
+        if after is not None:
+            after(prob, detection)
+        return detection
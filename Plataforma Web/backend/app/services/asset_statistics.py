@@ -0,0 +1,64 @@
+"""
+Inspection statistics per asset, aggregated in SQL
+Inspections are grouped by (asset, severity) in the database and left-joined
+to the selected assets, so one statement returns the counts, latest date and
+severity distribution of one asset, a list of assets or a whole IFC file
+without loading the inspection rows.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Asset, Inspection
+
+
+def asset_statistics(db: Session, asset_ids: Optional[List[int]] = None,
+                     ifc_file_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+    """Statistics keyed by asset id for the given assets and/or IFC file; missing assets are absent"""
+    selected = []
+    if asset_ids is not None:
+        selected.append(Asset.id.in_(asset_ids))
+    if ifc_file_id is not None:
+        selected.append(Asset.ifc_file_id == ifc_file_id)
+
+    grouped = (
+        select(
+            Inspection.asset_id,
+            Inspection.severity,
+            func.count().label("total"),
+            func.sum(case((Inspection.has_pathology, 1), else_=0)).label("with_pathology"),
+            func.max(Inspection.inspection_date).label("latest"),
+        )
+        .where(Inspection.asset_id.in_(select(Asset.id).where(*selected)))
+        .group_by(Inspection.asset_id, Inspection.severity)
+        .subquery()
+    )
+    rows = db.execute(
+        select(Asset.id, Asset.condition_status, Asset.condition_score,
+               grouped.c.severity, grouped.c.total, grouped.c.with_pathology, grouped.c.latest)
+        .outerjoin(grouped, grouped.c.asset_id == Asset.id)
+        .where(*selected)
+        .order_by(Asset.id, grouped.c.severity)
+    ).all()
+
+    statistics: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        stats = statistics.setdefault(row.id, {
+            "asset_id": row.id,
+            "total_inspections": 0,
+            "inspections_with_pathology": 0,
+            "latest_inspection_date": None,
+            "current_condition": row.condition_status,
+            "current_condition_score": row.condition_score,
+            "severity_distribution": {},
+        })
+        if row.total is None:
+            continue  # asset without inspections
+        stats["total_inspections"] += row.total
+        stats["inspections_with_pathology"] += row.with_pathology or 0
+        if stats["latest_inspection_date"] is None or row.latest > stats["latest_inspection_date"]:
+            stats["latest_inspection_date"] = row.latest
+        if row.severity:
+            stats["severity_distribution"][row.severity] = row.total
+    return statistics
@@ -13,8 +13,16 @@ def sync_to_blender(ifc_file: IFCFile, db: Session) -> Dict[str, Any]:
     Prepare data for export to Blender
     Returns data structure compatible with BlenderBIM/Bonsai
     """
-    assets = db.query(Asset).filter(Asset.ifc_file_id == ifc_file.id).all()
-    inspections = db.query(Inspection).join(Asset).filter(Asset.ifc_file_id == ifc_file.id).all()
+    # Column projections: one query per table, no ORM objects or lazy loads
+    assets = db.query(
+        Asset.ifc_guid, Asset.name, Asset.ifc_type, Asset.condition_status, Asset.condition_score,
+        Asset.manufacturer, Asset.serial_number, Asset.location_building, Asset.location_floor,
+        Asset.location_room,
+    ).filter(Asset.ifc_file_id == ifc_file.id).order_by(Asset.id).all()
+    inspections = db.query(
+        Inspection.code, Asset.ifc_guid, Inspection.inspection_date, Inspection.has_pathology,
+        Inspection.severity, Inspection.location, Inspection.observations,
+    ).join(Asset).filter(Asset.ifc_file_id == ifc_file.id).order_by(Inspection.id).all()
     
     # Format data for Blender
     blender_data = {
@@ -47,7 +55,7 @@ def sync_to_blender(ifc_file: IFCFile, db: Session) -> Dict[str, Any]:
     for inspection in inspections:
         inspection_data = {
             "code": inspection.code,
-            "asset_ifc_guid": inspection.asset.ifc_guid,
+            "asset_ifc_guid": inspection.ifc_guid,
             "inspection_date": inspection.inspection_date.isoformat() if inspection.inspection_date else None,
             "has_pathology": inspection.has_pathology,
             "severity": inspection.severity,
@@ -70,13 +78,15 @@ def sync_from_blender(ifc_file: IFCFile, db: Session, blender_data: Dict[str, An
     
     updated_count = 0
     
-    # Update assets
+    # Update assets, loaded with one query instead of one per GUID
     if "assets" in blender_data:
+        guids = [asset_data.get("ifc_guid") for asset_data in blender_data["assets"]]
+        by_guid = {
+            asset.ifc_guid: asset
+            for asset in db.query(Asset).filter(Asset.ifc_guid.in_(guids), Asset.ifc_file_id == ifc_file.id)
+        } if guids else {}
         for asset_data in blender_data["assets"]:
-            asset = db.query(Asset).filter(
-                Asset.ifc_guid == asset_data.get("ifc_guid"),
-                Asset.ifc_file_id == ifc_file.id
-            ).first()
+            asset = by_guid.get(asset_data.get("ifc_guid"))
             
             if asset:
                 if "condition_status" in asset_data:
@@ -0,0 +1,166 @@
+"""
+Batched row writer for bulk ingestion
+Collects rows per table and writes them with executemany or PostgreSQL COPY
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Table, func, insert, or_
+from sqlalchemy.orm import Session
+
+
+class ColumnBatch:
+    """Pending rows for one table, stored as tuples in a fixed column order"""
+
+    def __init__(self, table: Table, columns: Sequence[str], conflict_columns: Sequence[str] = (),
+                 update_columns: Sequence[str] = (), owner_column: Optional[str] = None):
+        self.table = table
+        self.columns = list(columns)
+        self.conflict_columns = list(conflict_columns)
+        self.update_columns = list(update_columns)
+        self.owner_column = owner_column
+        self.rows: List[tuple] = []
+
+    def add(self, row: Dict[str, Any]):
+        self.rows.append(tuple(row.get(column) for column in self.columns))
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+class BulkWriter:
+    """
+    Buffers rows per table and flushes them in batches.
+    Uses COPY through a staging table on PostgreSQL (so conflicts can still be
+    resolved with ON CONFLICT) and executemany elsewhere. Rows conflicting on
+    conflict_columns are skipped, or upserted when update_columns are given;
+    with an owner_column, only stored rows whose owner matches the new row's
+    (or is NULL) are updated and the others are skipped.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 5000, use_copy: bool = True):
+        self.db = db
+        self.batch_size = batch_size
+        self.dialect = db.get_bind().dialect.name
+        self.use_copy = use_copy and self.dialect == "postgresql"
+        self.batches: Dict[str, ColumnBatch] = {}
+        self.rows_written: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def register(self, table: Table, columns: Sequence[str], conflict_columns: Sequence[str] = (),
+                 update_columns: Sequence[str] = (), owner_column: Optional[str] = None):
+        """Declare the columns written for a table and how key conflicts are handled"""
+        self.batches[table.name] = ColumnBatch(table, columns, conflict_columns, update_columns, owner_column)
+        self.rows_written.setdefault(table.name, 0)
+
+    def add(self, table: Table, row: Dict[str, Any]):
+        """Queue a row, flushing the table when its batch is full"""
+        batch = self.batches[table.name]
+        batch.add(row)
+        if len(batch.rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table: Optional[Table] = None):
+        """Write pending rows of one table (or all tables, in registration order)"""
+        batches = [self.batches[table.name]] if table is not None else list(self.batches.values())
+        for batch in batches:
+            if not batch.rows:
+                continue
+            if self.use_copy:
+                self._copy(batch)
+            else:
+                statement = insert_on_conflict(self.db, batch.table, batch.conflict_columns, batch.update_columns,
+                                               batch.owner_column)
+                self.db.execute(statement, batch.as_dicts())
+            self.rows_written[batch.table.name] += len(batch.rows)
+            batch.rows = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Rows written so far and throughput"""
+        seconds = time.perf_counter() - self.started
+        rows = sum(self.rows_written.values())
+        return {
+            "rows": rows,
+            "rows_by_table": dict(self.rows_written),
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+        }
+
+    def _copy(self, batch: ColumnBatch):
+        """COPY rows into a temporary staging table, then move them into the target"""
+        name = batch.table.name
+        staging = f"_stage_{name}"
+        columns = ", ".join(batch.columns)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch.rows:
+            writer.writerow([_copy_value(value) for value in row])
+        buffer.seek(0)
+
+        conflict = ""
+        if batch.conflict_columns and batch.update_columns:
+            assignments = [f"{column} = EXCLUDED.{column}" for column in batch.update_columns]
+            if "updated_at" in batch.table.c:
+                assignments.append("updated_at = now()")
+            conflict = f" ON CONFLICT ({', '.join(batch.conflict_columns)}) DO UPDATE SET {', '.join(assignments)}"
+            if batch.owner_column:
+                owner = f"{name}.{batch.owner_column}"
+                conflict += f" WHERE {owner} IS NULL OR {owner} = EXCLUDED.{batch.owner_column}"
+        elif batch.conflict_columns:
+            conflict = f" ON CONFLICT ({', '.join(batch.conflict_columns)}) DO NOTHING"
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+                f"SELECT {columns} FROM {name} WITH NO DATA"
+            )
+            cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            cursor.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {staging}{conflict}")
+            cursor.execute(f"TRUNCATE {staging}")
+        finally:
+            cursor.close()
+
+
+def insert_on_conflict(db: Session, table: Table, conflict_columns: Sequence[str] = (),
+                       update_columns: Sequence[str] = (), owner_column: Optional[str] = None):
+    """
+    INSERT statement for rows that may conflict on the given unique columns:
+    conflicting rows are skipped, or updated from the new values when
+    update_columns are given (only if the stored owner_column is NULL or
+    equal to the new one, when owner_column is set)
+    """
+    dialect = db.get_bind().dialect.name
+    if conflict_columns and dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif conflict_columns and dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    statement = dialect_insert(table)
+    if not update_columns:
+        return statement.on_conflict_do_nothing(index_elements=list(conflict_columns))
+    assignments = {column: statement.excluded[column] for column in update_columns}
+    if "updated_at" in table.c:
+        assignments["updated_at"] = func.now()
+    where = None
+    if owner_column:
+        owner = table.c[owner_column]
+        where = or_(owner.is_(None), owner == statement.excluded[owner_column])
+    return statement.on_conflict_do_update(index_elements=list(conflict_columns), set_=assignments, where=where)
+
+
+def _copy_value(value: Any) -> Any:
+    """Render a Python value for COPY ... (FORMAT csv)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
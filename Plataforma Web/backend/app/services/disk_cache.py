@@ -0,0 +1,100 @@
+"""
+Size-bounded on-disk LRU cache
+Entries are single files named by key; reads refresh the file mtime and
+eviction removes the least recently used files until the cache fits.
+Stores keep a running total of the cache size; the directory is only
+scanned when that total crosses the limit (or the last scan is old, since
+other processes may share the directory), and eviction then goes down to a
+low-water mark so the next stores do not scan again right away.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+LOW_WATER = 0.9  # eviction shrinks the cache to this fraction of max_bytes
+RESCAN_SECONDS = 300.0  # recount the directory at least this often while storing
+
+
+class DiskCache:
+    """Directory of cache files bounded by total size"""
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ""):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None  # bytes, as of the last scan plus later stores
+        self._scanned_at = 0.0
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the entry path on a hit (marking it recently used), None on a miss"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextmanager
+    def store(self, key: str) -> Iterator[Path]:
+        """
+        Yield a temporary path to write the entry to; it is renamed into place
+        atomically when the block exits cleanly and discarded otherwise
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=self.suffix)
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        path = self.path_for(key)
+        try:
+            yield tmp_path
+            added = tmp_path.stat().st_size
+            try:
+                added -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        with self._lock:
+            if self._total is not None:
+                self._total += added
+            due = (self._total is None or self._total > self.max_bytes
+                   or time.monotonic() - self._scanned_at > RESCAN_SECONDS)
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Rescan the directory and, if it exceeds max_bytes, delete least
+        recently used entries until it is down to LOW_WATER of the limit
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.name.startswith(".tmp-"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            entries.sort()
+            if total > self.max_bytes:
+                for _, size, path in entries:
+                    if total <= self.max_bytes * LOW_WATER:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            self._total = total
+            self._scanned_at = time.monotonic()
@@ -0,0 +1,98 @@
+"""
+Content-addressed cache of extracted IFC payloads
+Keyed by the file's SHA-256, its IFC schema and the extractor version, so a
+re-uploaded model can be loaded into the database without ifcopenshell.
+"""
+import gzip
+import hashlib
+import pickle
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.disk_cache import DiskCache
+
+SCHEMA_PATTERN = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']+)'", re.IGNORECASE)
+RECORD_BATCH_SIZE = 1000
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file on disk (for files uploaded before hashing existed)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_ifc_schema(file_path: str, header_bytes: int = 65536) -> str:
+    """Read the schema name from the STEP header without parsing the model"""
+    with open(file_path, "rb") as f:
+        match = SCHEMA_PATTERN.search(f.read(header_bytes))
+    return match.group(1).decode("ascii", "replace").upper() if match else "UNKNOWN"
+
+
+class ParseRecorder:
+    """Writes rows to a cache entry in batches while they pass through"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pending: List[Any] = []
+
+    def tee(self, rows: Iterable[Any]) -> Iterator[Any]:
+        for row in rows:
+            self.pending.append(row)
+            if len(self.pending) >= RECORD_BATCH_SIZE:
+                self.flush()
+            yield row
+
+    def flush(self):
+        if self.pending:
+            pickle.dump(self.pending, self.stream, protocol=pickle.HIGHEST_PROTOCOL)
+            self.pending = []
+
+
+class IFCParseCache:
+    """Compressed on-disk store of (header, rows) payloads with LRU eviction"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.cache = DiskCache(directory, max_bytes, suffix=".pkl.gz")
+
+    @staticmethod
+    def key(file_hash: str, schema: str, extractor_version: int, geometry: bool = False) -> str:
+        return f"{file_hash}-{schema.lower()}-v{extractor_version}{'-geom' if geometry else ''}"
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], Iterator[Any]]]:
+        """Return (header, row iterator) on a hit, None on a miss or unreadable entry"""
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        stream = gzip.open(path, "rb")
+        try:
+            header = pickle.load(stream)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            stream.close()
+            path.unlink(missing_ok=True)
+            return None
+        return header, self._iter_rows(stream)
+
+    @contextmanager
+    def recorder(self, key: str, header: Dict[str, Any]) -> Iterator[ParseRecorder]:
+        """Record rows for key; the entry is only published if the block succeeds"""
+        with self.cache.store(key) as tmp_path:
+            with gzip.open(tmp_path, "wb", compresslevel=3) as stream:
+                pickle.dump(header, stream, protocol=pickle.HIGHEST_PROTOCOL)
+                recorder = ParseRecorder(stream)
+                yield recorder
+                recorder.flush()
+
+    @staticmethod
+    def _iter_rows(stream) -> Iterator[Any]:
+        with stream:
+            while True:
+                try:
+                    batch = pickle.load(stream)
+                except EOFError:
+                    return
+                yield from batch
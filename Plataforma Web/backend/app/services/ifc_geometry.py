@@ -0,0 +1,62 @@
+"""
+IFC geometry stage
+Tessellates products with the multi-threaded ifcopenshell geometry iterator
+and reduces each shape to an axis-aligned bounding box and its centre, which
+are stored on the asset rows for spatial queries.
+"""
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import ifcopenshell
+import ifcopenshell.geom
+import numpy as np
+
+GEOMETRY_COLUMNS = [
+    "centroid_x", "centroid_y", "centroid_z",
+    "bbox_min_x", "bbox_min_y", "bbox_min_z",
+    "bbox_max_x", "bbox_max_y", "bbox_max_z",
+]
+
+
+def compute_bounds(ifc_file_obj, threads: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    Map GlobalId -> geometry columns for every product with a body representation.
+    Coordinates are in world space; the centroid is the centre of the bounding box.
+    """
+    geom_settings = ifcopenshell.geom.settings()
+    geom_settings.set(geom_settings.USE_WORLD_COORDS, True)
+
+    bounds: Dict[str, Dict[str, float]] = {}
+    products = ifc_file_obj.by_type("IfcProduct")
+    if not products:
+        return bounds
+    iterator = ifcopenshell.geom.iterator(geom_settings, ifc_file_obj, max(1, threads), include=products)
+    if not iterator.initialize():
+        return bounds
+    while True:
+        shape = iterator.get()
+        verts = shape.geometry.verts
+        if verts:
+            bounds[shape.guid] = bounds_row(np.asarray(verts, dtype=np.float64).reshape(-1, 3))
+        if not iterator.next():
+            break
+    return bounds
+
+
+def bounds_row(points: np.ndarray) -> Dict[str, float]:
+    """Geometry column values for an (n, 3) array of vertices"""
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    centre = (low + high) / 2
+    return dict(zip(GEOMETRY_COLUMNS, map(float, (*centre, *low, *high))))
+
+
+def with_geometry(rows: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                  bounds: Dict[str, Dict[str, float]], rehash) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Merge computed bounds into the asset rows; rehash refreshes the element content hash"""
+    for element_row, asset_row in rows:
+        if asset_row:
+            geometry = bounds.get(asset_row["ifc_guid"])
+            if geometry:
+                asset_row.update(geometry)
+                element_row["content_hash"] = rehash(element_row, asset_row)
+        yield element_row, asset_row
@@ -0,0 +1,65 @@
+"""
+Multi-process IFC element extraction
+Splits the IfcProduct set into contiguous partitions that a process pool
+extracts in parallel; results are yielded in partition order so the single
+writer sees exactly the rows of the serial path.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ifcopenshell
+
+from app.config import settings
+from app.services.ifc_processor import build_location_index, build_property_index, iter_element_rows
+
+# Per-worker state, set by _init_worker
+_worker_ifc = None
+_worker_property_index = None
+_worker_location_index = None
+
+
+def iter_element_rows_parallel(ifc_file_obj, file_path: str, ifc_file_id: int, workers: int,
+                               partition_size: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Yield (element_row, asset_row) pairs extracted by a pool of worker processes"""
+    partition_size = partition_size or settings.IFC_BATCH_SIZE
+    product_ids = [element.id() for element in ifc_file_obj.by_type("IfcProduct")]
+    partitions = [product_ids[i:i + partition_size] for i in range(0, len(product_ids), partition_size)]
+    if not partitions:
+        return
+
+    # spawn: never fork a process that holds DB connections or server threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(partitions)),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(file_path,),
+    ) as executor:
+        # Keep a bounded window of partitions in flight and consume them in
+        # submission order, so memory stays flat while workers run ahead
+        pending = deque()
+        remaining = iter(partitions)
+        for partition in islice(remaining, workers * 2):
+            pending.append(executor.submit(_extract_partition, partition, ifc_file_id))
+        while pending:
+            batch = pending.popleft().result()
+            for partition in islice(remaining, 1):
+                pending.append(executor.submit(_extract_partition, partition, ifc_file_id))
+            yield from batch
+
+
+def _init_worker(file_path: str):
+    """Open the IFC file once per worker process"""
+    global _worker_ifc, _worker_property_index, _worker_location_index
+    _worker_ifc = ifcopenshell.open(file_path)
+    _worker_property_index = build_property_index(_worker_ifc)
+    _worker_location_index = build_location_index(_worker_ifc)
+
+
+def _extract_partition(product_ids: List[int], ifc_file_id: int) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Extract the rows of one partition inside a worker"""
+    elements = (_worker_ifc.by_id(product_id) for product_id in product_ids)
+    return list(iter_element_rows(elements, ifc_file_id, _worker_property_index, _worker_location_index))
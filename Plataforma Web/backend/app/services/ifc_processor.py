@@ -2,17 +2,51 @@
 IFC file processing service using IfcOpenShell
 """
 import ifcopenshell
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import SessionLocal
 from app.models import IFCFile, IFCElement, Asset
+from app.services.bulk_writer import BulkWriter
+from app.services.ifc_cache import IFCParseCache, read_ifc_schema, sha256_file
+from app.services.ifc_geometry import GEOMETRY_COLUMNS, compute_bounds, with_geometry
+from app.services.ifc_properties import PropertyLoader
+from app.services.spatial_index import update_location_points
 from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
 import json
+import time
 
+# Bump whenever the extracted rows (or their content hash) change, so cached payloads are not reused
+EXTRACTOR_VERSION = 5
 
-def process_ifc_file(ifc_file_id: int, file_path: str):
+ELEMENT_COLUMNS = ["ifc_id", "ifc_guid", "ifc_type", "name", "ifc_file_id", "ifc_data", "content_hash"]
+LOCATION_COLUMNS = ["location_building", "location_floor", "location_room"]
+ASSET_COLUMNS = ["ifc_guid", "ifc_type", "name", "description", "ifc_file_id"] + LOCATION_COLUMNS + GEOMETRY_COLUMNS
+
+# Slot of each spatial structure type in a (site, building, storey, space) location
+SPATIAL_LEVELS = {"IfcSite": 0, "IfcBuilding": 1, "IfcBuildingStorey": 2, "IfcSpace": 3}
+NO_LOCATION = (None, None, None, None)
+
+_parse_cache: Optional[IFCParseCache] = None
+
+
+class IngestionError(ValueError):
+    """
+    The file cannot be ingested as uploaded (unparsable, changed since upload,
+    GlobalIds owned by another file); retrying will not help
+    """
+
+
+def process_ifc_file(ifc_file_id: int, file_path: str, incremental: bool = False,
+                     progress: Optional[Callable[[int, Optional[int]], None]] = None):
     """
     Process IFC file and extract elements/assets
-    Runs in background task
+    Runs in an ingestion worker (or a background task)
+    incremental=True treats the file as a new revision of the model already
+    stored under ifc_file_id and only applies the differences
+    progress is called with (elements processed, total elements) as rows are loaded
     """
     db = SessionLocal()
     try:
@@ -24,52 +58,32 @@ def process_ifc_file(ifc_file_id: int, file_path: str):
         ifc_file.processing_status = "processing"
         db.commit()
         
-        # Open IFC file
         try:
-            ifc_file_obj = ifcopenshell.open(file_path)
-            ifc_file.ifc_schema = ifc_file_obj.schema
-            
-            # Extract project information
-            project = ifc_file_obj.by_type("IfcProject")[0] if ifc_file_obj.by_type("IfcProject") else None
-            if project:
-                ifc_file.project_name = project.Name or ifc_file.project_name
-                ifc_file.project_description = getattr(project, "Description", None)
-            
             # Process all elements
-            elements_processed = 0
-            for element in ifc_file_obj.by_type("IfcProduct"):
-                try:
-                    # Create IFCElement record
-                    db_element = IFCElement(
-                        ifc_id=element.id(),
-                        ifc_guid=element.GlobalId,
-                        ifc_type=element.is_a(),
-                        name=getattr(element, "Name", None),
-                        ifc_file_id=ifc_file_id,
-                        ifc_data=extract_ifc_data(element)
-                    )
-                    db.add(db_element)
-                    
-                    # Create Asset record (for elements we want to track)
-                    if should_create_asset(element):
-                        db_asset = Asset(
-                            ifc_guid=element.GlobalId,
-                            ifc_type=element.is_a(),
-                            name=getattr(element, "Name", None),
-                            ifc_file_id=ifc_file_id,
-                            description=getattr(element, "Description", None)
-                        )
-                        db.add(db_asset)
-                    
-                    elements_processed += 1
-                    if elements_processed % 100 == 0:
-                        db.commit()
-                        
-                except Exception as e:
-                    print(f"Error processing element {element.id()}: {str(e)}")
-                    continue
-            
-            db.commit()
+            if settings.IFC_BULK_INSERT or incremental:
+                stats = ingest_file_bulk(db, ifc_file, file_path, incremental, progress)
+            else:
+                ifc_file_obj = open_model(file_path)
+                apply_project_info(ifc_file, read_project_info(ifc_file_obj))
+                stats = ingest_elements_orm(db, ifc_file_obj, ifc_file_id, progress)
+            print(
+                f"IFC file {ifc_file_id}: {stats['rows']} rows in {stats['seconds']:.1f}s "
+                f"({stats['rows_per_sec']:.0f} rows/s){' [cache hit]' if stats.get('cache_hit') else ''}"
+            )
+            if incremental:
+                print(
+                    f"IFC file {ifc_file_id} revision: {stats['inserted']} inserted, {stats['updated']} updated, "
+                    f"{stats['deleted']} deleted, {stats['unchanged']} unchanged"
+                )
+            skipped = stats.get("skipped", {}).get(IFCElement.__tablename__, 0)
+            if skipped:
+                message = f"{skipped} elements skipped: their GlobalIds already belong to another IFC file"
+                if not incremental and not stats["rows_by_table"].get(IFCElement.__tablename__):
+                    raise IngestionError(f"No elements stored; {message}")
+                print(f"IFC file {ifc_file_id}: {message}")
+                ifc_file.processing_error = message
+            if settings.IFC_GEOMETRY_ENABLED:
+                update_location_points(db, ifc_file_id)
             
             # Update status
             ifc_file.processing_status = "completed"
@@ -77,6 +91,7 @@ def process_ifc_file(ifc_file_id: int, file_path: str):
             db.commit()
             
         except Exception as e:
+            db.rollback()
             ifc_file.processing_status = "error"
             ifc_file.processing_error = str(e)
             db.commit()
@@ -86,8 +101,279 @@ def process_ifc_file(ifc_file_id: int, file_path: str):
         db.close()
 
 
-def extract_ifc_data(element):
-    """Extract IFC element data as JSON"""
+def ingest_file_bulk(db: Session, ifc_file: IFCFile, file_path: str, incremental: bool = False,
+                     progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """
+    Bulk-ingest an IFC file through the parse cache.
+    A hit loads the stored rows without opening the model with ifcopenshell;
+    a miss parses the model and records its rows for the next upload.
+    With incremental=True the rows are diffed against the stored revision.
+    """
+    def load_rows(rows, header):
+        if progress:
+            rows = track_progress(rows, progress, header.get("product_count"))
+        if incremental:
+            from app.services.ifc_revision import apply_revision
+            return apply_revision(db, rows, ifc_file.id)
+        return write_element_rows(db, rows, ifc_file.id)
+    
+    cache = get_parse_cache()
+    if cache is None:
+        ifc_file_obj = open_model(file_path)
+        header = read_project_info(ifc_file_obj)
+        apply_project_info(ifc_file, header)
+        return load_rows(extract_element_rows(ifc_file_obj, ifc_file.id, file_path, settings.IFC_WORKERS), header)
+    
+    # Keyed on the file actually parsed: it must still be the uploaded one,
+    # or its rows would be cached under the upload's hash
+    file_hash = sha256_file(file_path)
+    if ifc_file.file_hash and ifc_file.file_hash != file_hash:
+        raise IngestionError(
+            f"{file_path} changed since upload (SHA-256 {file_hash}, expected {ifc_file.file_hash})"
+        )
+    ifc_file.file_hash = file_hash
+    key = cache.key(file_hash, read_ifc_schema(file_path), EXTRACTOR_VERSION,
+                    geometry=settings.IFC_GEOMETRY_ENABLED)
+    
+    cached = cache.load(key)
+    if cached is not None:
+        header, rows = cached
+        apply_project_info(ifc_file, header)
+        stats = load_rows(with_file_id(rows, ifc_file.id), header)
+        stats["cache_hit"] = True
+        return stats
+    
+    ifc_file_obj = open_model(file_path)
+    header = read_project_info(ifc_file_obj)
+    apply_project_info(ifc_file, header)
+    with cache.recorder(key, header) as recorder:
+        rows = extract_element_rows(ifc_file_obj, ifc_file.id, file_path, settings.IFC_WORKERS)
+        return load_rows(recorder.tee(rows), header)
+
+
+def get_parse_cache() -> Optional[IFCParseCache]:
+    """Process-wide parse cache, or None when disabled"""
+    global _parse_cache
+    if not settings.IFC_CACHE_ENABLED:
+        return None
+    if _parse_cache is None:
+        _parse_cache = IFCParseCache(settings.IFC_CACHE_DIR, settings.IFC_CACHE_MAX_BYTES)
+    return _parse_cache
+
+
+def open_model(file_path: str):
+    """ifcopenshell.open, with parse/schema errors raised as IngestionError"""
+    try:
+        return ifcopenshell.open(file_path)
+    except ifcopenshell.Error as e:
+        raise IngestionError(f"Cannot parse IFC file: {e}") from e
+
+
+def read_project_info(ifc_file_obj) -> Dict[str, Any]:
+    """Schema and IfcProject information of an opened model"""
+    info = {"schema": ifc_file_obj.schema, "product_count": len(ifc_file_obj.by_type("IfcProduct"))}
+    projects = ifc_file_obj.by_type("IfcProject")
+    if projects:
+        info["project_name"] = projects[0].Name
+        info["project_description"] = getattr(projects[0], "Description", None)
+    return info
+
+
+def apply_project_info(ifc_file: IFCFile, info: Dict[str, Any]):
+    """Copy schema/project information onto the IFCFile record"""
+    ifc_file.ifc_schema = info["schema"]
+    if "project_name" in info:
+        ifc_file.project_name = info["project_name"] or ifc_file.project_name
+        ifc_file.project_description = info["project_description"]
+
+
+def ingest_elements_bulk(db: Session, ifc_file_obj, ifc_file_id: int,
+                         file_path: Optional[str] = None, workers: int = 1) -> Dict[str, Any]:
+    """
+    Write elements and assets as batched multi-row inserts (COPY on PostgreSQL)
+    instead of one ORM object per product
+    """
+    return write_element_rows(db, extract_element_rows(ifc_file_obj, ifc_file_id, file_path, workers), ifc_file_id)
+
+
+def extract_element_rows(ifc_file_obj, ifc_file_id: int, file_path: Optional[str] = None,
+                         workers: int = 1) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    (element_row, asset_row) pairs for every product of the model.
+    With workers > 1 rows are extracted by a process pool (see ifc_parallel)
+    and the caller's session stays the single writer.
+    With IFC_GEOMETRY_ENABLED the asset rows also carry bounding boxes.
+    """
+    if workers > 1 and file_path:
+        from app.services.ifc_parallel import iter_element_rows_parallel
+        rows = iter_element_rows_parallel(ifc_file_obj, file_path, ifc_file_id, workers)
+    else:
+        property_index = build_property_index(ifc_file_obj)
+        location_index = build_location_index(ifc_file_obj)
+        rows = iter_element_rows(ifc_file_obj.by_type("IfcProduct"), ifc_file_id, property_index, location_index)
+    if settings.IFC_GEOMETRY_ENABLED:
+        rows = with_geometry(rows, compute_bounds(ifc_file_obj, settings.IFC_GEOMETRY_THREADS), content_hash)
+    return rows
+
+
+def write_element_rows(db: Session, rows: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                       ifc_file_id: int) -> Dict[str, Any]:
+    """
+    Bulk-write (element_row, asset_row) pairs plus the assets' normalized
+    properties, and commit. Rows whose GlobalId is already stored (for another
+    file) are skipped and counted in stats["skipped"].
+    """
+    writer = BulkWriter(db, batch_size=settings.IFC_BATCH_SIZE, use_copy=settings.IFC_USE_COPY)
+    writer.register(Asset.__table__, ASSET_COLUMNS, conflict_columns=["ifc_guid"])
+    writer.register(IFCElement.__table__, ELEMENT_COLUMNS, conflict_columns=["ifc_guid"])
+    properties = PropertyLoader(db, ifc_file_id)
+    
+    for element_row, asset_row in rows:
+        writer.add(IFCElement.__table__, element_row)
+        if asset_row:
+            writer.add(Asset.__table__, asset_row)
+            properties.add(asset_row["ifc_guid"], element_row["ifc_data"].get("properties"))
+    
+    writer.flush()
+    skipped = {}
+    for model in (IFCElement, Asset):
+        stored = db.execute(
+            select(func.count()).select_from(model).where(model.ifc_file_id == ifc_file_id)
+        ).scalar()
+        skipped[model.__tablename__] = writer.rows_written[model.__tablename__] - stored
+        writer.rows_written[model.__tablename__] = stored
+    writer.rows_written["properties"] = properties.write()
+    db.commit()
+    stats = writer.stats()
+    stats["skipped"] = skipped
+    return stats
+
+
+def track_progress(rows, progress: Callable[[int, Optional[int]], None], total: Optional[int],
+                   every: int = 100):
+    """Pass rows through, reporting (rows seen, total) every `every` rows and at the end"""
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done, total)
+    progress(done, total)
+
+
+def with_file_id(rows, ifc_file_id: int):
+    """Re-target cached rows to the IFCFile being loaded"""
+    for element_row, asset_row in rows:
+        element_row["ifc_file_id"] = ifc_file_id
+        if asset_row:
+            asset_row["ifc_file_id"] = ifc_file_id
+        yield element_row, asset_row
+
+
+def iter_element_rows(elements, ifc_file_id: int, property_index,
+                      location_index=None) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Yield (element_row, asset_row or None) per product, skipping elements that fail"""
+    for element in elements:
+        try:
+            element_row = build_element_row(element, ifc_file_id, property_index)
+            asset_row = build_asset_row(element, ifc_file_id, location_index) if should_create_asset(element) else None
+            element_row["content_hash"] = content_hash(element_row, asset_row)
+        except Exception as e:
+            print(f"Error processing element {element.id()}: {str(e)}")
+            continue
+        yield element_row, asset_row
+
+
+def ingest_elements_orm(db: Session, ifc_file_obj, ifc_file_id: int,
+                        progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Legacy per-object ORM ingestion loop (kept for comparison benchmarks)"""
+    started = time.perf_counter()
+    total = len(ifc_file_obj.by_type("IfcProduct"))
+    elements_processed = 0
+    assets_created = 0
+    location_index = build_location_index(ifc_file_obj)
+    for element in ifc_file_obj.by_type("IfcProduct"):
+        try:
+            # Create IFCElement record
+            db_element = IFCElement(**build_element_row(element, ifc_file_id))
+            db.add(db_element)
+            
+            # Create Asset record (for elements we want to track)
+            if should_create_asset(element):
+                db_asset = Asset(**build_asset_row(element, ifc_file_id, location_index))
+                db.add(db_asset)
+                assets_created += 1
+            
+            elements_processed += 1
+            if elements_processed % 100 == 0:
+                db.commit()
+                if progress:
+                    progress(elements_processed, total)
+                
+        except Exception as e:
+            print(f"Error processing element {element.id()}: {str(e)}")
+            continue
+    
+    db.commit()
+    
+    seconds = time.perf_counter() - started
+    rows = elements_processed + assets_created
+    return {
+        "rows": rows,
+        "rows_by_table": {"ifc_elements": elements_processed, "assets": assets_created},
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def build_element_row(element, ifc_file_id: int, property_index=None) -> Dict[str, Any]:
+    """Column values of the IFCElement row for an IFC product"""
+    return {
+        "ifc_id": element.id(),
+        "ifc_guid": element.GlobalId,
+        "ifc_type": element.is_a(),
+        "name": getattr(element, "Name", None),
+        "ifc_file_id": ifc_file_id,
+        "ifc_data": extract_ifc_data(element, property_index),
+    }
+
+
+def build_asset_row(element, ifc_file_id: int, location_index=None) -> Dict[str, Any]:
+    """
+    Column values of the Asset row for a tracked IFC product
+    location_index (from build_location_index) fills the building/floor/room columns
+    """
+    row = {
+        "ifc_guid": element.GlobalId,
+        "ifc_type": element.is_a(),
+        "name": getattr(element, "Name", None),
+        "description": getattr(element, "Description", None),
+        "ifc_file_id": ifc_file_id,
+    }
+    if location_index is not None:
+        row.update(zip(LOCATION_COLUMNS, location_index.get(element.id(), NO_LOCATION)[1:]))
+    return row
+
+
+def content_hash(element_row: Dict[str, Any], asset_row: Optional[Dict[str, Any]]) -> str:
+    """
+    Hash of everything extracted for an element, used to detect changes between revisions.
+    The STEP instance number (ifc_id) is left out: exporters renumber it on every save.
+    """
+    element = {k: v for k, v in element_row.items() if k not in ("ifc_id", "ifc_file_id", "content_hash")}
+    element["ifc_data"] = {k: v for k, v in element_row["ifc_data"].items() if k != "ifc_id"}
+    payload = [
+        element,
+        {k: v for k, v in asset_row.items() if k != "ifc_file_id"} if asset_row else None,
+    ]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def extract_ifc_data(element, property_index: Optional[Dict[int, List[Dict[str, Any]]]] = None):
+    """
+    Extract IFC element data as JSON
+    property_index (from build_property_index) replaces the per-element IsDefinedBy walk
+    """
     data = {
         "ifc_id": element.id(),
         "ifc_guid": element.GlobalId,
@@ -103,27 +389,93 @@ def extract_ifc_data(element):
     
     # Extract properties
     if hasattr(element, "IsDefinedBy"):
-        properties = []
-        for prop_def in element.IsDefinedBy:
-            if prop_def.is_a("IfcRelDefinesByProperties"):
-                prop_set = prop_def.RelatingPropertyDefinition
-                if prop_set.is_a("IfcPropertySet"):
-                    prop_data = {
-                        "name": prop_set.Name,
-                        "properties": {}
-                    }
-                    for prop in prop_set.HasProperties:
-                        if prop.is_a("IfcPropertySingleValue"):
-                            prop_data["properties"][prop.Name] = {
-                                "value": str(prop.NominalValue.wrappedValue) if prop.NominalValue else None,
-                                "type": prop.NominalValue.wrappedValue.is_a() if prop.NominalValue else None
-                            }
-                    properties.append(prop_data)
-        data["properties"] = properties
+        if property_index is not None:
+            data["properties"] = property_index.get(element.id(), [])
+        else:
+            properties = []
+            for prop_def in element.IsDefinedBy:
+                if prop_def.is_a("IfcRelDefinesByProperties"):
+                    prop_set = prop_def.RelatingPropertyDefinition
+                    if prop_set.is_a("IfcPropertySet"):
+                        properties.append(property_set_data(prop_set))
+            data["properties"] = properties
     
     return data
 
 
+def build_property_index(ifc_file_obj) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Map element id -> property set data in a single pass over IfcRelDefinesByProperties.
+    Property sets shared by many elements are converted once and the same dict
+    is referenced from every element.
+    """
+    index: Dict[int, List[Dict[str, Any]]] = {}
+    converted: Dict[int, Dict[str, Any]] = {}
+    for rel in ifc_file_obj.by_type("IfcRelDefinesByProperties"):
+        prop_set = rel.RelatingPropertyDefinition
+        if not prop_set.is_a("IfcPropertySet"):
+            continue
+        prop_data = converted.get(prop_set.id())
+        if prop_data is None:
+            prop_data = converted[prop_set.id()] = property_set_data(prop_set)
+        for related in rel.RelatedObjects:
+            index.setdefault(related.id(), []).append(prop_data)
+    return index
+
+
+def build_location_index(ifc_file_obj) -> Dict[int, Tuple[Optional[str], ...]]:
+    """
+    Map element id -> (site, building, storey, space) names in one pass over
+    IfcRelContainedInSpatialStructure and IfcRelAggregates.
+    Each container is resolved once and its location shared by everything
+    below it, so deep hierarchies are not walked again per element.
+    """
+    parents: Dict[int, Any] = {}
+    for rel in ifc_file_obj.by_type("IfcRelAggregates"):
+        for related in rel.RelatedObjects:
+            parents[related.id()] = rel.RelatingObject
+    for rel in ifc_file_obj.by_type("IfcRelContainedInSpatialStructure"):
+        for element in rel.RelatedElements:
+            parents[element.id()] = rel.RelatingStructure
+    
+    index: Dict[int, Tuple[Optional[str], ...]] = {}
+    for element_id in list(parents):
+        if element_id in index:
+            continue
+        # Walk up to the first resolved ancestor, then resolve the chain top-down
+        chain = []
+        seen = set()
+        entity_id = element_id
+        while entity_id is not None and entity_id not in index and entity_id not in seen:
+            seen.add(entity_id)
+            chain.append(entity_id)
+            parent = parents.get(entity_id)
+            entity_id = parent.id() if parent is not None else None
+        location = index.get(entity_id, NO_LOCATION)
+        for entity_id in reversed(chain):
+            entity = ifc_file_obj.by_id(entity_id)
+            slot = SPATIAL_LEVELS.get(entity.is_a())
+            if slot is not None:
+                location = location[:slot] + (entity.Name or getattr(entity, "LongName", None),) + location[slot + 1:]
+            index[entity_id] = location
+    return index
+
+
+def property_set_data(prop_set) -> Dict[str, Any]:
+    """Convert an IfcPropertySet to its JSON representation"""
+    prop_data = {
+        "name": prop_set.Name,
+        "properties": {}
+    }
+    for prop in prop_set.HasProperties:
+        if prop.is_a("IfcPropertySingleValue"):
+            prop_data["properties"][prop.Name] = {
+                "value": str(prop.NominalValue.wrappedValue) if prop.NominalValue else None,
+                "type": prop.NominalValue.is_a() if prop.NominalValue else None
+            }
+    return prop_data
+
+
 def should_create_asset(element):
     """Determine if an IFC element should be tracked as an Asset"""
     # Track structural elements, MEP components, etc.
@@ -0,0 +1,128 @@
+"""
+Normalized property storage
+Writes the property sets of ingested assets as deduplicated PropertySet rows
+(one per distinct set, shared across elements and files) and typed Property
+rows per asset, so property filters run as indexed SQL instead of JSON scans.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Asset, Property, PropertySet
+from app.services.bulk_writer import BulkWriter
+
+PROPERTY_SET_COLUMNS = ["name", "content_hash"]
+PROPERTY_COLUMNS = ["name", "value", "value_number", "data_type", "property_set_id", "asset_id"]
+
+# IFC value types that are never numeric, even when the text looks like a number
+TEXT_TYPES = {"IfcLabel", "IfcText", "IfcIdentifier", "IfcBoolean", "IfcLogical"}
+
+LOOKUP_BATCH_SIZE = 1000
+
+
+class PropertyLoader:
+    """
+    Collects the property sets of asset rows and writes them after the assets
+    exist. Only assets owned by ifc_file_id get properties: a GUID whose
+    insert was skipped because another file already holds it is left alone.
+    """
+
+    def __init__(self, db: Session, ifc_file_id: int):
+        self.db = db
+        self.ifc_file_id = ifc_file_id
+        self.asset_property_sets: Dict[str, List[Dict[str, Any]]] = {}
+        # id(prop_set dict) -> (dict, hash); shared dicts are hashed once
+        self._hashes: Dict[int, tuple] = {}
+
+    def add(self, asset_guid: str, property_sets: List[Dict[str, Any]]):
+        if property_sets:
+            self.asset_property_sets[asset_guid] = property_sets
+
+    def write(self, replace: bool = False) -> int:
+        """
+        Write PropertySet and Property rows for the collected assets.
+        replace=True first removes the assets' existing property rows (revisions).
+        Returns the number of Property rows written.
+        """
+        asset_ids = self._asset_ids(list(self.asset_property_sets))
+        if replace and asset_ids:
+            ids = list(asset_ids.values())
+            for i in range(0, len(ids), LOOKUP_BATCH_SIZE):
+                self.db.execute(delete(Property).where(Property.asset_id.in_(ids[i:i + LOOKUP_BATCH_SIZE])))
+
+        set_ids = self._property_set_ids()
+
+        writer = BulkWriter(self.db, batch_size=settings.IFC_BATCH_SIZE, use_copy=settings.IFC_USE_COPY)
+        writer.register(Property.__table__, PROPERTY_COLUMNS)
+        for guid, property_sets in self.asset_property_sets.items():
+            asset_id = asset_ids.get(guid)
+            if asset_id is None:
+                continue
+            for prop_set in property_sets:
+                set_id = set_ids[self._hash(prop_set)]
+                for name, prop in prop_set["properties"].items():
+                    writer.add(Property.__table__, {
+                        "name": name,
+                        "value": prop["value"],
+                        "value_number": numeric_value(prop["value"], prop["type"]),
+                        "data_type": prop["type"],
+                        "property_set_id": set_id,
+                        "asset_id": asset_id,
+                    })
+        writer.flush()
+        return writer.rows_written[Property.__tablename__]
+
+    def _hash(self, prop_set: Dict[str, Any]) -> str:
+        cached = self._hashes.get(id(prop_set))
+        if cached is None:
+            digest = hashlib.sha1(json.dumps(prop_set, sort_keys=True).encode("utf-8")).hexdigest()
+            cached = self._hashes[id(prop_set)] = (prop_set, digest)
+        return cached[1]
+
+    def _asset_ids(self, guids: List[str]) -> Dict[str, int]:
+        asset_ids = {}
+        for i in range(0, len(guids), LOOKUP_BATCH_SIZE):
+            rows = self.db.execute(
+                select(Asset.ifc_guid, Asset.id).where(
+                    Asset.ifc_file_id == self.ifc_file_id, Asset.ifc_guid.in_(guids[i:i + LOOKUP_BATCH_SIZE])
+                )
+            ).all()
+            asset_ids.update(rows)
+        return asset_ids
+
+    def _property_set_ids(self) -> Dict[str, int]:
+        """Insert the distinct property sets not stored yet and map content hash -> id"""
+        distinct: Dict[str, str] = {}
+        for property_sets in self.asset_property_sets.values():
+            for prop_set in property_sets:
+                distinct.setdefault(self._hash(prop_set), prop_set["name"])
+
+        writer = BulkWriter(self.db, batch_size=settings.IFC_BATCH_SIZE, use_copy=settings.IFC_USE_COPY)
+        writer.register(PropertySet.__table__, PROPERTY_SET_COLUMNS, conflict_columns=["content_hash"])
+        for digest, name in distinct.items():
+            writer.add(PropertySet.__table__, {"name": name, "content_hash": digest})
+        writer.flush()
+
+        hashes = list(distinct)
+        set_ids = {}
+        for i in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            rows = self.db.execute(
+                select(PropertySet.content_hash, PropertySet.id)
+                .where(PropertySet.content_hash.in_(hashes[i:i + LOOKUP_BATCH_SIZE]))
+            ).all()
+            set_ids.update(rows)
+        return set_ids
+
+
+def numeric_value(value: Optional[str], value_type: Optional[str]) -> Optional[float]:
+    """Numeric form of a property value for range queries, None for text values"""
+    if value is None or value_type in TEXT_TYPES:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
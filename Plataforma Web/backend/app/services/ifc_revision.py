@@ -0,0 +1,126 @@
+"""
+Revision-aware IFC re-ingestion
+Diffs a new revision of a model against the elements already stored for it
+(by GlobalId and per-element content hash) and writes only the changes:
+new and modified elements/assets are bulk-upserted, removed ones deleted.
+Unchanged rows are never touched (apart from their renumbered STEP id), so
+asset ids, inspections and MIR data stay attached to them. Rows are only
+upserted over rows of the same file (or detached assets): a GlobalId owned
+by another file is skipped.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Asset, IFCElement, Inspection, Property
+from app.services.bulk_writer import BulkWriter
+from app.services.ifc_processor import ASSET_COLUMNS, ELEMENT_COLUMNS
+from app.services.ifc_properties import PropertyLoader
+
+ELEMENT_UPDATE_COLUMNS = [c for c in ELEMENT_COLUMNS if c != "ifc_guid"]
+# Only the IFC-derived columns; MIR and condition columns are left alone
+ASSET_UPDATE_COLUMNS = [c for c in ASSET_COLUMNS if c != "ifc_guid"]
+
+DELETE_BATCH_SIZE = 1000
+
+
+def apply_revision(db: Session, rows: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                   ifc_file_id: int) -> Dict[str, Any]:
+    """Apply the difference between rows and the stored elements of ifc_file_id, then commit"""
+    stored_hashes = {}
+    stored_ids = {}
+    for guid, stored_hash, ifc_id in db.execute(
+        select(IFCElement.ifc_guid, IFCElement.content_hash, IFCElement.ifc_id)
+        .where(IFCElement.ifc_file_id == ifc_file_id)
+    ):
+        stored_hashes[guid] = stored_hash
+        stored_ids[guid] = ifc_id
+    stored_assets = set(db.execute(
+        select(Asset.ifc_guid).where(Asset.ifc_file_id == ifc_file_id)
+    ).scalars())
+
+    writer = BulkWriter(db, batch_size=settings.IFC_BATCH_SIZE, use_copy=settings.IFC_USE_COPY)
+    writer.register(Asset.__table__, ASSET_COLUMNS, conflict_columns=["ifc_guid"],
+                    update_columns=ASSET_UPDATE_COLUMNS, owner_column="ifc_file_id")
+    writer.register(IFCElement.__table__, ELEMENT_COLUMNS, conflict_columns=["ifc_guid"],
+                    update_columns=ELEMENT_UPDATE_COLUMNS, owner_column="ifc_file_id")
+
+    properties = PropertyLoader(db, ifc_file_id)
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    untracked_assets: List[str] = []
+    renumbered: List[Dict[str, Any]] = []
+    missing = object()
+    for element_row, asset_row in rows:
+        guid = element_row["ifc_guid"]
+        stored_hash = stored_hashes.pop(guid, missing)
+        if stored_hash == element_row["content_hash"]:
+            counts["unchanged"] += 1
+            if stored_ids[guid] != element_row["ifc_id"]:
+                renumbered.append({"guid": guid, "new_ifc_id": element_row["ifc_id"]})
+            continue
+        counts["inserted" if stored_hash is missing else "updated"] += 1
+        writer.add(IFCElement.__table__, element_row)
+        if asset_row:
+            writer.add(Asset.__table__, asset_row)
+            properties.add(guid, element_row["ifc_data"].get("properties"))
+        elif guid in stored_assets:
+            untracked_assets.append(guid)
+    writer.flush()
+    writer.rows_written["properties"] = properties.write(replace=True)
+    update_ifc_ids(db, renumbered)
+
+    # New rows whose GlobalId belongs to another file were skipped by the upsert
+    stored = db.execute(
+        select(func.count()).select_from(IFCElement).where(IFCElement.ifc_file_id == ifc_file_id)
+    ).scalar()
+    skipped = len(stored_ids) + counts["inserted"] - stored
+    counts["inserted"] -= skipped
+
+    # Whatever is left in stored_hashes is gone from the new revision
+    removed = list(stored_hashes)
+    counts["deleted"] = len(removed)
+    for i in range(0, len(removed), DELETE_BATCH_SIZE):
+        db.execute(delete(IFCElement).where(
+            IFCElement.ifc_file_id == ifc_file_id,
+            IFCElement.ifc_guid.in_(removed[i:i + DELETE_BATCH_SIZE]),
+        ))
+    remove_assets(db, ifc_file_id, [guid for guid in removed if guid in stored_assets] + untracked_assets)
+
+    db.commit()
+    stats = writer.stats()
+    stats.update(counts)
+    stats["skipped"] = {IFCElement.__tablename__: skipped}
+    return stats
+
+
+def update_ifc_ids(db: Session, renumbered: List[Dict[str, Any]]):
+    """Store the new STEP ids of unchanged elements ({"guid", "new_ifc_id"} dicts)"""
+    table = IFCElement.__table__
+    statement = update(table).where(table.c.ifc_guid == bindparam("guid")).values(ifc_id=bindparam("new_ifc_id"))
+    for i in range(0, len(renumbered), DELETE_BATCH_SIZE):
+        db.execute(statement, renumbered[i:i + DELETE_BATCH_SIZE])
+
+
+def remove_assets(db: Session, ifc_file_id: int, guids: List[str]):
+    """
+    Delete assets that left the model. Assets with inspection history are
+    detached from the file (ifc_file_id = NULL) instead, so no inspection is lost.
+    """
+    for i in range(0, len(guids), DELETE_BATCH_SIZE):
+        batch = guids[i:i + DELETE_BATCH_SIZE]
+        in_batch = (Asset.ifc_file_id == ifc_file_id) & Asset.ifc_guid.in_(batch)
+        inspected = exists().where(Inspection.asset_id == Asset.id)
+        db.execute(
+            delete(Property).where(Property.asset_id.in_(select(Asset.id).where(in_batch, ~inspected))),
+            execution_options={"synchronize_session": False},
+        )
+        db.execute(
+            update(Asset).where(in_batch, inspected).values(ifc_file_id=None),
+            execution_options={"synchronize_session": False},
+        )
+        db.execute(
+            delete(Asset).where(in_batch, ~inspected),
+            execution_options={"synchronize_session": False},
+        )
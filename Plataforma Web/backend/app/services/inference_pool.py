@@ -0,0 +1,337 @@
+"""
+Thread-budgeted inference worker pool
+Each worker is a separate process with its own warm model, a fixed PyTorch
+thread budget (intra-op threads, one inter-op thread) and optionally its own
+CPU cores, so several workers never oversubscribe the machine. The scheduler
+hands each batch to an idle worker and queues it while all are busy.
+With several server processes (uvicorn workers) each pool only plans over
+its own slice of the cores (AI_PROCESS_SLOTS).
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_pool: Optional["InferencePool"] = None
+_pool_lock = threading.Lock()
+_core_slice: Optional[Tuple[List[int], bool]] = None
+_slot_handles: List[Any] = []
+
+RELOAD = "reload"  # task queue message: reload the checkpoint
+RESTART_DELAY = 30.0  # seconds before a failed pool is rebuilt on the next request
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def claim_core_slice(slots: int, lock_dir) -> Tuple[List[int], bool]:
+    """
+    (cores, exclusive) for this process when slots server processes share the
+    machine. A process claims the first free slot by holding an exclusive lock
+    on its file until it exits; without a free slot (or fcntl) it gets a
+    slice-sized share to plan threads with, but not to pin to.
+    """
+    global _core_slice
+    cores = available_cores()
+    if slots <= 1:
+        return cores, True
+    if _core_slice is not None:
+        return _core_slice
+    size = max(1, len(cores) // slots)
+    try:
+        import fcntl
+    except ImportError:
+        return cores[:size], False
+    os.makedirs(lock_dir, exist_ok=True)
+    for index in range(slots):
+        handle = open(os.path.join(lock_dir, f"slot-{index}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        # The handle stays open (and locked) for the life of the process
+        _slot_handles.append(handle)
+        assigned = cores[index * size:(index + 1) * size]
+        # More slots than cores: share the last cores, unpinned
+        _core_slice = (assigned, True) if assigned else (cores[-size:], False)
+        return _core_slice
+    print(f"Warning: all {slots} core slots are taken; raise AI_PROCESS_SLOTS to match the server processes")
+    _core_slice = (cores[:size], False)
+    return _core_slice
+
+
+def apply_thread_budget(threads: int, cores: Optional[List[int]] = None):
+    """Limit this process to threads intra-op threads (and the given cores)"""
+    import torch
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if threads > 0:
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # only settable before the first inter-op parallel work
+
+
+def plan_layout(workers: int, threads: int, pin: bool, cores: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Threads and cores per worker; threads=0 splits the cores (default: all available) evenly"""
+    cores = cores if cores is not None else available_cores()
+    workers = max(1, workers)
+    threads = threads if threads > 0 else max(1, len(cores) // workers)
+    layout = []
+    for index in range(workers):
+        assigned = cores[index * threads:(index + 1) * threads]
+        # Without enough cores for disjoint sets, pinning would only add contention
+        pinned = pin and len(assigned) == threads and workers * threads <= len(cores)
+        layout.append({"threads": threads, "cores": assigned if pinned else None})
+    return layout
+
+
+def _worker_main(index: int, settings_values: Dict[str, Any], threads: int, cores: Optional[List[int]],
+                 tasks, results):
+    """
+    Worker process: load the model, then run batches until told to stop.
+    The model is looked up per batch (the registry is keyed by the checkpoint's
+    mtime), so a replaced checkpoint is picked up; RELOAD forces a reload.
+    """
+    apply_thread_budget(threads, cores)
+    from app.config import Settings
+    from app.services.ai_service import get_model, predict_tensor
+    import torch
+
+    settings = Settings(**{**settings_values, "AI_TORCH_THREADS": threads, "AI_INFERENCE_WORKERS": 0})
+    try:
+        model, device = get_model(settings)
+    except Exception as e:
+        results.put((None, index, False, f"model load failed: {e}"))
+        return
+    results.put((None, index, True, None))
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        if item == RELOAD:
+            try:
+                get_model(settings, reload=True)
+            except Exception as e:
+                print(f"Error: inference worker {index} could not reload the model: {e}")
+            continue
+        task_id, batch = item
+        try:
+            model, device = get_model(settings)
+            results.put((task_id, index, True, predict_tensor(model, device, torch.from_numpy(batch))))
+        except Exception as e:
+            results.put((task_id, index, False, f"{type(e).__name__}: {e}"))
+
+
+class InferencePool:
+    """Process pool with one task queue per worker and idle-first scheduling"""
+
+    def __init__(self, settings, workers: int, threads: int = 0, pin: bool = False,
+                 cores: Optional[List[int]] = None):
+        context = multiprocessing.get_context("spawn")
+        self.layout = plan_layout(workers, threads, pin, cores)
+        self.results = context.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._futures: Dict[int, Future] = {}
+        self._idle = deque()
+        self._backlog = deque()
+        self._ready = threading.Event()
+        self._starting = len(self.layout)
+        self.stats = [{"batches": 0, "images": 0, "busy": False, "ready": False} for _ in self.layout]
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+        self._closing = False
+
+        values = settings.model_dump()
+        self.tasks = []
+        self.processes = []
+        for index, plan in enumerate(self.layout):
+            tasks = context.Queue()
+            process = context.Process(
+                target=_worker_main, args=(index, values, plan["threads"], plan["cores"], tasks, self.results),
+                name=f"inference-worker-{index}", daemon=True,
+            )
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+        self._collector = threading.Thread(target=self._collect, name="inference-pool-results", daemon=True)
+        self._collector.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every worker has loaded its model (or one failed)"""
+        return self._ready.wait(timeout)
+
+    def submit(self, batch: np.ndarray) -> Future:
+        """Probability maps (n, H, W) for an (n, C, H, W) float32 batch, computed by the next idle worker"""
+        future: Future = Future()
+        with self._lock:
+            if self.error is not None:
+                future.set_exception(RuntimeError(self.error))
+                return future
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+            if self._idle:
+                self._dispatch(self._idle.popleft(), task_id, batch)
+            else:
+                self._backlog.append((task_id, batch))
+        return future
+
+    def reload(self):
+        """Have every worker reload the checkpoint after the batch it is running"""
+        for tasks in self.tasks:
+            tasks.put(RELOAD)
+
+    def _dispatch(self, index: int, task_id: int, batch: np.ndarray):
+        self.stats[index]["busy"] = True
+        self.stats[index]["batches"] += 1
+        self.stats[index]["images"] += len(batch)
+        self.tasks[index].put((task_id, np.ascontiguousarray(batch, dtype=np.float32)))
+
+    def _collect(self):
+        while True:
+            try:
+                message = self.results.get(timeout=1.0)
+            except queue.Empty:
+                if self._closing:
+                    return
+                self._check_workers()
+                continue
+            task_id, index, ok, payload = message
+            with self._lock:
+                if task_id is None:
+                    # Worker start-up report
+                    self._starting -= 1
+                    if ok:
+                        self.stats[index]["ready"] = True
+                    else:
+                        self._set_error(payload)
+                    if ok:
+                        self._worker_idle(index)
+                    if self._starting == 0 or not ok:
+                        self._ready.set()
+                    continue
+                future = self._futures.pop(task_id, None)
+                self._worker_idle(index)
+            if future is not None:
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        """Fail pending work if a worker process died (crash, OOM kill)"""
+        dead = [p.name for p in self.processes if p.exitcode is not None]
+        if not dead or self._closing:
+            return
+        with self._lock:
+            self._set_error(f"inference worker exited: {', '.join(dead)}")
+        self._ready.set()
+
+    def _set_error(self, reason: str):
+        """Mark the pool failed (get_inference_pool rebuilds it later) and fail pending work"""
+        if self.error is None:
+            self.error = reason
+            self.failed_at = time.monotonic()
+            print(f"Error: {reason}")
+        self._fail_all(reason)
+
+    def _worker_idle(self, index: int):
+        self.stats[index]["busy"] = False
+        if self._backlog:
+            task_id, batch = self._backlog.popleft()
+            self._dispatch(index, task_id, batch)
+        else:
+            self._idle.append(index)
+
+    def _fail_all(self, reason: str):
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+        self._futures.clear()
+        self._backlog.clear()
+
+    @property
+    def size(self) -> int:
+        return len(self.processes)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": [
+                    {**plan, **stats, "pid": process.pid}
+                    for plan, stats, process in zip(self.layout, self.stats, self.processes)
+                ],
+                "queued": len(self._backlog),
+                "error": self.error,
+            }
+
+    def close(self):
+        self._closing = True
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for tasks in self.tasks:
+            # Undelivered batches (dead workers) must not block interpreter exit
+            tasks.cancel_join_thread()
+        self._collector.join(timeout=2)
+        with self._lock:
+            self._fail_all("inference pool closed")
+
+
+def get_inference_pool(settings) -> Optional[InferencePool]:
+    """Process-wide pool when AI_INFERENCE_WORKERS > 0, else None (in-process inference)"""
+    global _pool
+    if settings.AI_INFERENCE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is not None and _pool.error is not None and time.monotonic() - _pool.failed_at >= RESTART_DELAY:
+            # Failed at start-up (e.g. no model yet) or a worker died: start over
+            print(f"Restarting inference pool after: {_pool.error}")
+            _pool.close()
+            _pool = None
+        if _pool is None:
+            cores, exclusive = claim_core_slice(settings.AI_PROCESS_SLOTS, settings.AI_SLOT_DIR)
+            _pool = InferencePool(settings, settings.AI_INFERENCE_WORKERS, settings.AI_THREADS_PER_WORKER,
+                                  settings.AI_PIN_WORKERS and exclusive, cores)
+        return _pool
+
+
+def reload_inference_pool(settings):
+    """
+    Make the running pool's workers reload the checkpoint; a failed pool is
+    rebuilt instead (no-op without a pool)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            return
+        if _pool.error is None:
+            _pool.reload()
+            return
+        _pool.close()
+        _pool = None
+    get_inference_pool(settings)
+
+
+def stop_inference_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,148 @@
+"""
+In-process micro-batching inference server
+Callers on the event loop submit single input tensors and await a future;
+a batcher task coalesces queued requests into batches of up to AI_MAX_BATCH
+(waiting at most AI_MAX_WAIT_MS for stragglers) and runs each batch on a
+dedicated inference thread, so the loop stays responsive under load. With an
+InferencePool, one batch per idle worker process is in flight instead.
+The queue is bounded: when it is full, predict() waits for room.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import torch
+
+from app.services.inference_pool import InferencePool, get_inference_pool
+
+_server: Optional["InferenceServer"] = None
+
+
+class InferenceServer:
+    """Batches predict() calls from concurrent requests into shared forward passes"""
+
+    def __init__(self, settings, max_batch: int, max_wait_ms: float, pool: Optional[InferencePool] = None,
+                 queue_size: int = 0):
+        self.settings = settings
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.queue_size = max(self.max_batch, queue_size)
+        self.pool = pool
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0}
+
+    def start(self):
+        """Bind to the running event loop and start the batcher task"""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # One batch in flight per pool worker (or on the inference thread)
+        self.slots = asyncio.Semaphore(self.pool.size if self.pool is not None else 1)
+        self._task = self.loop.create_task(self._batcher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def predict(self, tensor: torch.Tensor) -> np.ndarray:
+        """Probability map (H, W) for one preprocessed (C, H, W) input"""
+        future = self.loop.create_future()
+        await self.queue.put((tensor, future))
+        return await future
+
+    async def _batcher(self):
+        while True:
+            # Batches form while workers are busy, so they are as full as possible
+            await self.slots.acquire()
+            batch: List[Tuple[torch.Tensor, asyncio.Future]] = [await self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that went away (client disconnects) are not computed
+            batch = [(tensor, future) for tensor, future in batch if not future.done()]
+            if not batch:
+                self.slots.release()
+                continue
+            task = self.loop.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[torch.Tensor, asyncio.Future]]):
+        try:
+            tensors = [t for t, _ in batch]
+            if self.pool is not None:
+                # Looked up per batch: a failed pool is replaced by get_inference_pool
+                self.pool = get_inference_pool(self.settings) or self.pool
+                probs = await asyncio.wrap_future(self.pool.submit(torch.stack(tensors).numpy()))
+            else:
+                probs = await self.loop.run_in_executor(self.executor, self._run, tensors)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+        for (_, future), prob in zip(batch, probs):
+            if not future.done():
+                future.set_result(prob)
+        self.stats["requests"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+
+    def _run(self, tensors: List[torch.Tensor]) -> np.ndarray:
+        """Forward pass on the inference thread"""
+        from app.services.ai_service import get_model, predict_batch
+        model, device = get_model(self.settings)
+        return predict_batch(model, device, tensors)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_size": self.queue_size,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            **self.stats,
+            "pool": self.pool.info() if self.pool is not None else None,
+        }
+
+
+def get_inference_server(settings) -> InferenceServer:
+    """Process-wide server, started on the calling event loop at first use"""
+    global _server
+    loop = asyncio.get_running_loop()
+    if _server is None or _server.loop is not loop:
+        if _server is not None:
+            _server.executor.shutdown(wait=False)
+        _server = InferenceServer(settings, settings.AI_MAX_BATCH, settings.AI_MAX_WAIT_MS,
+                                  get_inference_pool(settings), settings.AI_SERVER_QUEUE_SIZE)
+        _server.start()
+    return _server
+
+
+async def stop_inference_server():
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
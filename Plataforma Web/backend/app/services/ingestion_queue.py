@@ -0,0 +1,283 @@
+"""
+Durable IFC ingestion queue
+Uploads insert IngestionJob rows; worker processes (worker.py) claim them with
+SELECT ... FOR UPDATE SKIP LOCKED, run process_ifc_file while writing progress
+to the job row, and retry failures with exponential backoff. A heartbeat
+thread keeps running jobs from being taken for crashed ones.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import IFCFile, IngestionJob
+from app.services.ifc_processor import IngestionError, process_ifc_file
+
+# Failures worth retrying: the database or the file system was briefly unavailable.
+# Anything else (IngestionError, bugs) fails the job on the first attempt.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError)
+
+
+def enqueue_ingestion(db: Session, ifc_file: IFCFile, incremental: bool = False) -> IngestionJob:
+    """Queue processing of an uploaded file (the caller commits)"""
+    job = IngestionJob(
+        ifc_file_id=ifc_file.id,
+        file_path=ifc_file.file_path,
+        incremental=incremental,
+        status="queued",
+        max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+        run_after=datetime.now(),
+    )
+    db.add(job)
+    return job
+
+
+def queued_job_count(db: Session) -> int:
+    return db.execute(
+        select(func.count()).select_from(IngestionJob).where(IngestionJob.status == "queued")
+    ).scalar()
+
+
+def latest_job(db: Session, ifc_file_id: int) -> Optional[IngestionJob]:
+    return db.query(IngestionJob).filter(
+        IngestionJob.ifc_file_id == ifc_file_id
+    ).order_by(IngestionJob.id.desc()).first()
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[IngestionJob]:
+    """
+    Claim the oldest runnable job, or return None when the queue is empty.
+    Rows locked by other workers are skipped (PostgreSQL); the conditional
+    UPDATE keeps the claim exclusive on databases without row locks.
+    """
+    now = datetime.now()
+    job_id = db.execute(
+        select(IngestionJob.id)
+        .where(IngestionJob.status == "queued", IngestionJob.run_after <= now)
+        .order_by(IngestionJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if job_id is None:
+        db.rollback()
+        return None
+    claimed = db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id, IngestionJob.status == "queued")
+        .values(status="running", worker_id=worker_id, attempts=IngestionJob.attempts + 1,
+                started_at=now, heartbeat_at=now, finished_at=None, error=None,
+                progress_done=0, progress_total=None, rate=None),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    db.commit()
+    return db.get(IngestionJob, job_id) if claimed else None
+
+
+def worker_alive(worker_id: Optional[str]) -> Optional[bool]:
+    """Whether a "host:pid" worker is still running; None when it runs on another host"""
+    host, _, pid = (worker_id or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Put back running jobs whose worker stopped sending heartbeats (crash,
+    restart); jobs that already used all their attempts are marked failed.
+    On SQLite the heartbeat cannot be written while an ingestion transaction
+    holds the database, so only jobs of dead workers on this host count as stale.
+    """
+    cutoff = datetime.now() - timedelta(seconds=settings.INGESTION_STALE_SECONDS)
+    stale = db.query(IngestionJob).filter(IngestionJob.status == "running", IngestionJob.heartbeat_at < cutoff).all()
+    if db.get_bind().dialect.name == "sqlite":
+        stale = [job for job in stale if worker_alive(job.worker_id) is False]
+    
+    now = datetime.now()
+    for job in stale:
+        error = f"worker {job.worker_id} stopped sending heartbeats"
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.error = error
+            job.finished_at = now
+            db.query(IFCFile).filter(IFCFile.id == job.ifc_file_id).update(
+                {"processing_status": "error", "processing_error": error}
+            )
+            print(f"Ingestion job {job.id} failed after {job.attempts} attempts: {error}")
+        else:
+            job.status = "queued"
+            job.worker_id = None
+            job.run_after = now
+            print(f"Ingestion job {job.id} requeued: {error}")
+    db.commit()
+    return len(stale)
+
+
+class Heartbeat:
+    """
+    Touches the job's heartbeat_at every INGESTION_HEARTBEAT_INTERVAL seconds
+    from a background thread with its own session, for as long as the job
+    runs - including phases without row progress (opening the IFC, index
+    builds, flushes)
+    """
+
+    def __init__(self, job_id: int, worker_id: Optional[str]):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingestion-heartbeat-{job_id}", daemon=True)
+
+    def start(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        db = SessionLocal()
+        try:
+            while not self._stop.wait(settings.INGESTION_HEARTBEAT_INTERVAL):
+                try:
+                    # Only while this worker still owns the job
+                    db.execute(
+                        update(IngestionJob)
+                        .where(IngestionJob.id == self.job_id, IngestionJob.status == "running",
+                               IngestionJob.worker_id == self.worker_id)
+                        .values(heartbeat_at=datetime.now()),
+                        execution_options={"synchronize_session": False},
+                    )
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    print(f"Warning: heartbeat of ingestion job {self.job_id} failed: {e}")
+        finally:
+            db.close()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class ProgressReporter:
+    """
+    Writes (done, total, rate) to the job row at most every
+    INGESTION_PROGRESS_INTERVAL seconds, in its own session so progress is
+    visible while the ingestion transaction is still open
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.last_write = 0.0
+        self.db = SessionLocal()
+        # SQLite has a single writer: the ingestion transaction holds it until commit
+        self.enabled = self.db.get_bind().dialect.name != "sqlite"
+
+    def __call__(self, done: int, total: Optional[int]):
+        now = time.monotonic()
+        if not self.enabled or now - self.last_write < settings.INGESTION_PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        self.write(done, total)
+
+    def write(self, done: int, total: Optional[int]):
+        elapsed = time.monotonic() - self.started
+        self.db.execute(
+            update(IngestionJob).where(IngestionJob.id == self.job_id).values(
+                progress_done=done, progress_total=total,
+                rate=done / elapsed if elapsed > 0 else None,
+                heartbeat_at=datetime.now(),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed job may succeed when retried"""
+    return isinstance(error, TRANSIENT_ERRORS) and not isinstance(error, (IngestionError, FileNotFoundError))
+
+
+def run_job(db: Session, job: IngestionJob):
+    """Run a claimed job and record its outcome (completed, retry or failed)"""
+    reporter = ProgressReporter(job.id)
+    heartbeat = Heartbeat(job.id, job.worker_id).start()
+    done = {"count": 0, "total": None}
+
+    def progress(count: int, total: Optional[int]):
+        done["count"], done["total"] = count, total
+        reporter(count, total)
+
+    try:
+        process_ifc_file(job.ifc_file_id, job.file_path, job.incremental, progress)
+    except Exception as e:
+        job.error = str(e)
+        job.heartbeat_at = datetime.now()
+        if is_transient(e) and job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = datetime.now() + timedelta(
+                seconds=settings.INGESTION_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+            db.query(IFCFile).filter(IFCFile.id == job.ifc_file_id).update({"processing_status": "pending"})
+            print(f"Ingestion job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying: {e}")
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.now()
+            db.query(IFCFile).filter(IFCFile.id == job.ifc_file_id).update(
+                {"processing_status": "error", "processing_error": str(e)}
+            )
+            if is_transient(e):
+                print(f"Ingestion job {job.id} failed after {job.attempts} attempts: {e}")
+            else:
+                print(f"Ingestion job {job.id} failed (not retryable): {e}")
+        db.commit()
+        return
+    finally:
+        heartbeat.stop()
+        reporter.close()
+
+    elapsed = (datetime.now() - job.started_at).total_seconds() if job.started_at else 0
+    job.status = "completed"
+    job.progress_done = done["count"]
+    job.progress_total = done["total"] if done["total"] is not None else done["count"]
+    job.rate = done["count"] / elapsed if elapsed > 0 else None
+    job.finished_at = job.heartbeat_at = datetime.now()
+    db.commit()
+
+
+def run_worker(worker_id: Optional[str] = None, once: bool = False):
+    """
+    Worker loop: requeue stale jobs, claim the next one and run it.
+    once=True drains the queue and returns instead of polling forever.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Ingestion worker {worker_id} started")
+    while True:
+        db = SessionLocal()
+        try:
+            requeue_stale_jobs(db)
+            job = claim_next_job(db, worker_id)
+            if job is not None:
+                print(f"Ingestion worker {worker_id}: job {job.id} (IFC file {job.ifc_file_id}, attempt {job.attempts})")
+                run_job(db, job)
+                continue
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(settings.INGESTION_POLL_INTERVAL)
@@ -0,0 +1,86 @@
+"""
+Compact detection mask encodings
+Masks are stored as COCO-style compressed run-length strings (column-major,
+readable by pycocotools) and described as simplified contour polygons with
+per-region pixel area, so overlays do not need the full-resolution PNG.
+"""
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+
+def rle_encode(mask: np.ndarray) -> str:
+    """Compressed RLE string of a 2-D boolean mask (runs start with zeros, column-major)"""
+    flat = np.asarray(mask, dtype=bool).ravel(order="F")
+    if flat.size == 0:
+        return ""
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], changes, [flat.size])))
+    counts = ([0] if flat[0] else []) + runs.tolist()
+
+    chars = []
+    for i, count in enumerate(counts):
+        x = count - counts[i - 2] if i > 2 else count
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return "".join(chars)
+
+
+def rle_decode(counts: str, shape: Tuple[int, int]) -> np.ndarray:
+    """Boolean mask of shape (height, width) from rle_encode output"""
+    runs: List[int] = []
+    position = 0
+    while position < len(counts):
+        x = shift = 0
+        more = True
+        while more:
+            c = ord(counts[position]) - 48
+            x |= (c & 0x1F) << shift
+            more = bool(c & 0x20)
+            position += 1
+            shift += 5
+            if not more and c & 0x10:
+                x |= -1 << shift
+        if len(runs) > 2:
+            x += runs[-2]
+        runs.append(x)
+    values = np.arange(len(runs)) % 2 == 1
+    flat = np.repeat(values, runs)
+    return flat.reshape(shape[1], shape[0]).T
+
+
+def mask_regions(mask: np.ndarray, scale_x: float = 1.0, scale_y: float = 1.0, epsilon: float = 1.0,
+                 min_area: int = 1, max_regions: int = 500) -> List[Dict[str, Any]]:
+    """
+    Connected regions of mask, largest first: pixel area, bounding box and a
+    polygon simplified to epsilon mask pixels. Coordinates and areas are scaled
+    by (scale_x, scale_y) to the original image and rounded to whole pixels.
+    """
+    mask_u8 = np.asarray(mask, dtype=np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask_u8, connectivity=8)
+    order = sorted(range(1, count), key=lambda label: -stats[label, cv2.CC_STAT_AREA])
+
+    regions = []
+    for label in order:
+        x, y, w, h, area = (int(v) for v in stats[label])
+        if area < min_area or len(regions) >= max_regions:
+            break
+        roi = (labels[y:y + h, x:x + w] == label).astype(np.uint8)
+        contours, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contour = max(contours, key=len)
+        polygon = cv2.approxPolyDP(contour, epsilon, True)[:, 0].astype(np.float64)
+        polygon[:, 0] = (polygon[:, 0] + x) * scale_x
+        polygon[:, 1] = (polygon[:, 1] + y) * scale_y
+        regions.append({
+            "area": round(area * scale_x * scale_y),
+            "bbox": [round(x * scale_x), round(y * scale_y), round(w * scale_x), round(h * scale_y)],
+            "polygon": np.rint(polygon).astype(int).tolist(),
+        })
+    return regions
@@ -0,0 +1,94 @@
+"""
+Process-wide registry of loaded models
+Keeps checkpoints loaded between requests, keyed by (path, mtime, device,
+variant): replacing the file on disk changes the key, so the new weights are
+picked up on the next request. Concurrent first loads of the same key load it once.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+ModelKey = Tuple[str, int, str, str]  # (absolute path, mtime_ns, device, variant)
+
+
+class ModelRegistry:
+    """LRU cache of models built by loader(path, device, variant)"""
+
+    def __init__(self, loader: Callable[[str, str, str], Any], max_models: int = 2):
+        self.loader = loader
+        self.max_models = max(1, max_models)
+        self._models: "OrderedDict[ModelKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+
+    @staticmethod
+    def key(path: str, device: str, variant: str = "") -> ModelKey:
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns, device, variant
+
+    def get(self, path: str, device: str, variant: str = "") -> Any:
+        """Return the loaded model, loading it on first use"""
+        key = self.key(path, device, variant)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                entry["hits"] += 1
+                return entry["model"]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only callers of the same key wait here; other checkpoints load concurrently
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    entry["hits"] += 1
+                    return entry["model"]
+            started = time.perf_counter()
+            model = self.loader(key[0], device, variant)
+            load_seconds = time.perf_counter() - started
+            with self._lock:
+                # Older versions of the same checkpoint are superseded
+                for stale in [k for k in self._models if k[0] == key[0] and k[2:] == key[2:]]:
+                    del self._models[stale]
+                self._models[key] = {
+                    "model": model,
+                    "hits": 0,
+                    "loaded_at": time.time(),
+                    "load_seconds": load_seconds,
+                }
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+                self._key_locks.pop(key, None)
+            print(f"Loaded model {key[0]} on {device}{f' ({variant})' if variant else ''} in {load_seconds:.1f}s")
+            return model
+
+    def reload(self, path: str, device: str, variant: str = "") -> Any:
+        """Drop every cached version of path on device and load it again"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._models if k[0] == path and k[2:] == (device, variant)]:
+                del self._models[key]
+        return self.get(path, device, variant)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Loaded models, most recently used last"""
+        with self._lock:
+            return [
+                {
+                    "path": key[0],
+                    "mtime_ns": key[1],
+                    "device": key[2],
+                    "variant": key[3],
+                    "hits": entry["hits"],
+                    "loaded_at": entry["loaded_at"],
+                    "load_seconds": entry["load_seconds"],
+                }
+                for key, entry in self._models.items()
+            ]
@@ -0,0 +1,51 @@
+"""
+SQL statement counter for N+1 checks
+Counts the statements an engine executes inside a with-block, so a check can
+call an endpoint at two data sizes and fail when the count grows with the
+number of rows returned (a lazy load per row).
+"""
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """with QueryCounter(engine) as counter: ...; counter.count, counter.statements"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def assert_constant_queries(engine: Engine, name: str, calls: Dict[int, Callable[[], object]]) -> Dict[int, int]:
+    """
+    Run each call (keyed by the result size it produces) under a QueryCounter
+    and return the statement count per size; AssertionError if they differ
+    """
+    counters = {}
+    for size, call in sorted(calls.items()):
+        with QueryCounter(engine) as counter:
+            call()
+        counters[size] = counter
+    counts = {size: counter.count for size, counter in counters.items()}
+    if len(set(counts.values())) > 1:
+        raise AssertionError(
+            f"{name}: query count grows with result size {counts}; "
+            f"last statements: {counters[max(counters)].statements[-3:]}"
+        )
+    return counts
@@ -0,0 +1,202 @@
+"""
+Spatial queries over asset centroids
+Runs on the GIST index of assets.location_coordinates when the database has
+PostGIS, otherwise on an in-process STRtree (R-tree) built from the centroid
+columns and cached until an IFC file is reprocessed.
+Points are (x, y, z); a z of None makes a query planar (x/y only).
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from shapely import STRtree, box, points
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Asset, IFCFile
+
+Point = Tuple[float, float, Optional[float]]
+Match = Tuple[int, float]  # (asset id, distance)
+
+SRID = 4326  # as declared for assets.location_coordinates in schema.sql
+
+_postgis: Dict[str, bool] = {}
+_rtrees: Dict[Optional[int], Tuple[tuple, "RTreeIndex"]] = {}
+_rtree_lock = threading.Lock()
+
+
+def has_postgis(db: Session) -> bool:
+    """Whether assets.location_coordinates is a PostGIS geometry column (checked once per database)"""
+    bind = db.get_bind()
+    url = str(bind.url)
+    if url not in _postgis:
+        found = False
+        if bind.dialect.name == "postgresql":
+            found = db.execute(text(
+                "SELECT udt_name FROM information_schema.columns "
+                "WHERE table_name = 'assets' AND column_name = 'location_coordinates'"
+            )).scalar() == "geometry"
+        _postgis[url] = found
+    return _postgis[url]
+
+
+def update_location_points(db: Session, ifc_file_id: int):
+    """Copy the centroids of a file's assets into the PostGIS point column (no-op without PostGIS)"""
+    if not has_postgis(db):
+        return
+    db.execute(text(
+        "UPDATE assets SET location_coordinates = ST_SetSRID(ST_MakePoint(centroid_x, centroid_y), :srid) "
+        "WHERE ifc_file_id = :ifc_file_id AND centroid_x IS NOT NULL"
+    ), {"srid": SRID, "ifc_file_id": ifc_file_id})
+    db.commit()
+
+
+def spatial_index(db: Session, ifc_file_id: Optional[int] = None):
+    """Index over the assets of one file (or all assets): PostGIS when available, else the cached R-tree"""
+    if has_postgis(db):
+        return PostGISIndex(db, ifc_file_id)
+    return rtree_index(db, ifc_file_id)
+
+
+def rtree_index(db: Session, ifc_file_id: Optional[int] = None) -> "RTreeIndex":
+    """Cached R-tree, rebuilt when a file is added, reprocessed or revised"""
+    files = select(IFCFile.id, IFCFile.revision, IFCFile.processed_at).order_by(IFCFile.id)
+    if ifc_file_id is not None:
+        files = files.where(IFCFile.id == ifc_file_id)
+    signature = tuple(db.execute(files).all())
+
+    with _rtree_lock:
+        cached = _rtrees.get(ifc_file_id)
+        if cached and cached[0] == signature:
+            return cached[1]
+        query = select(Asset.id, Asset.centroid_x, Asset.centroid_y, Asset.centroid_z).where(
+            Asset.centroid_x.isnot(None)
+        )
+        if ifc_file_id is not None:
+            query = query.where(Asset.ifc_file_id == ifc_file_id)
+        index = RTreeIndex(*centroid_arrays(db.execute(query).all()))
+        _rtrees[ifc_file_id] = (signature, index)
+        return index
+
+
+def centroid_arrays(rows) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids, (n, 3) centroids) from (id, x, y, z) rows"""
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    centroids = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 3)
+    return ids, centroids
+
+
+def distances(centroids: np.ndarray, center: Point) -> np.ndarray:
+    """Euclidean distances from center, planar when center has no z"""
+    dims = 2 if center[2] is None else 3
+    return np.sqrt(((centroids[:, :dims] - np.asarray(center[:dims], dtype=np.float64)) ** 2).sum(axis=1))
+
+
+def in_box(ids: np.ndarray, centroids: np.ndarray, low: Point, high: Point) -> List[int]:
+    """Ids whose centroid lies in the box; a None z bound is open"""
+    mask = ((centroids[:, 0] >= low[0]) & (centroids[:, 0] <= high[0])
+            & (centroids[:, 1] >= low[1]) & (centroids[:, 1] <= high[1]))
+    if low[2] is not None:
+        mask &= centroids[:, 2] >= low[2]
+    if high[2] is not None:
+        mask &= centroids[:, 2] <= high[2]
+    return np.sort(ids[mask]).tolist()
+
+
+def within_radius(ids: np.ndarray, centroids: np.ndarray, center: Point, radius: float) -> List[Match]:
+    """(id, distance) pairs within radius, nearest first"""
+    dist = distances(centroids, center)
+    keep = np.flatnonzero(dist <= radius)
+    order = keep[np.argsort(dist[keep], kind="stable")]
+    return list(zip(ids[order].tolist(), dist[order].tolist()))
+
+
+class RTreeIndex:
+    """STRtree over asset centroids (x/y), with z handled by exact refinement"""
+
+    def __init__(self, ids: np.ndarray, centroids: np.ndarray):
+        self.ids = ids
+        self.centroids = centroids
+        self.tree = STRtree(points(centroids[:, :2]))
+        self.low = centroids.min(axis=0) if len(ids) else np.zeros(3)
+        self.high = centroids.max(axis=0) if len(ids) else np.zeros(3)
+
+    def _candidates(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        return self.tree.query(box(xmin, ymin, xmax, ymax))
+
+    def box(self, low: Point, high: Point) -> List[int]:
+        hits = self._candidates(low[0], low[1], high[0], high[1])
+        return in_box(self.ids[hits], self.centroids[hits], low, high)
+
+    def within(self, center: Point, radius: float) -> List[Match]:
+        x, y = center[0], center[1]
+        hits = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        return within_radius(self.ids[hits], self.centroids[hits], center, radius)
+
+    def nearest(self, center: Point, k: int) -> List[Match]:
+        """k nearest centroids, widening the search radius beyond the index extent until k are covered"""
+        count = len(self.ids)
+        if count == 0 or k <= 0:
+            return []
+        k = min(k, count)
+        dims = 2 if center[2] is None else 3
+        point = np.asarray(center[:dims], dtype=np.float64)
+        low, high = self.low[:dims], self.high[:dims]
+        gap = float(np.linalg.norm(np.maximum(np.maximum(low - point, point - high), 0)))
+        reach = float(np.linalg.norm(np.maximum(np.abs(point - low), np.abs(point - high))))
+        step = (float((high - low).max()) or 1.0) * math.sqrt(k / count)
+        while True:
+            radius = gap + step
+            matches = self.within(center, radius)
+            if len(matches) >= k or radius >= reach:
+                return matches[:k]
+            step *= 2
+
+
+class PostGISIndex:
+    """Queries answered by the GIST index on location_coordinates, with z refined in Python"""
+
+    def __init__(self, db: Session, ifc_file_id: Optional[int] = None):
+        self.db = db
+        self.ifc_file_id = ifc_file_id
+
+    def _fetch(self, condition, order_by=None, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        query = select(Asset.id, Asset.centroid_x, Asset.centroid_y, Asset.centroid_z).where(
+            condition, Asset.centroid_x.isnot(None)
+        )
+        if self.ifc_file_id is not None:
+            query = query.where(Asset.ifc_file_id == self.ifc_file_id)
+        if order_by is not None:
+            query = query.order_by(order_by)
+        if limit is not None:
+            query = query.limit(limit)
+        return centroid_arrays(self.db.execute(query).all())
+
+    @staticmethod
+    def _point(center: Point):
+        return func.ST_SetSRID(func.ST_MakePoint(center[0], center[1]), SRID)
+
+    def box(self, low: Point, high: Point) -> List[int]:
+        envelope = func.ST_MakeEnvelope(low[0], low[1], high[0], high[1], SRID)
+        ids, centroids = self._fetch(Asset.location_coordinates.op("&&")(envelope))
+        return in_box(ids, centroids, low, high)
+
+    def within(self, center: Point, radius: float) -> List[Match]:
+        ids, centroids = self._fetch(func.ST_DWithin(Asset.location_coordinates, self._point(center), radius))
+        return within_radius(ids, centroids, center, radius)
+
+    def nearest(self, center: Point, k: int) -> List[Match]:
+        """KNN on the planar index; with z, the k-th planar hit bounds an exact 3D radius search"""
+        if k <= 0:
+            return []
+        ids, centroids = self._fetch(
+            Asset.location_coordinates.isnot(None),
+            order_by=Asset.location_coordinates.op("<->")(self._point(center)),
+            limit=k,
+        )
+        if len(ids) == 0:
+            return []
+        if center[2] is None:
+            return within_radius(ids, centroids, center, math.inf)
+        return self.within(center, float(distances(centroids, center).max()))[:k]
@@ -0,0 +1,59 @@
+"""
+Streaming upload writer
+Copies an UploadFile to disk chunk by chunk with async I/O, computing size
+and SHA-256 on the way, so peak memory per upload stays around one chunk.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+
+class SavedUpload:
+    """Result of a streamed upload"""
+
+    def __init__(self, path: Path, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+async def save_upload(upload: UploadFile, destination: Path, max_size: Optional[int] = None) -> SavedUpload:
+    """
+    Stream an upload to destination.
+    Data goes to a temporary file in the same directory that is renamed into
+    place atomically once complete; an upload larger than max_size
+    (default MAX_UPLOAD_SIZE) is rejected with 413 as soon as it crosses the limit.
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = tempfile.mkstemp(dir=destination.parent, prefix=".upload-")
+    os.close(fd)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_name, "wb") as out:
+            while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds maximum upload size of {max_size} bytes"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+        os.replace(tmp_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    return SavedUpload(destination, size, digest.hexdigest())
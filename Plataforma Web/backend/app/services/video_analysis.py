@@ -0,0 +1,230 @@
+"""
+Streaming video analysis
+A decoder thread reads the video sequentially with OpenCV, samples frames at
+the requested rate, drops near-duplicates with a cheap frame-difference test
+and hands preprocessed frames to the model through a bounded queue. Per-frame
+results and the detection timeline are appended to JSONL files as they are
+produced, so memory stays flat regardless of video length.
+"""
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.ai_service import get_model, predict_batch, val_transform
+
+_DONE = object()
+
+
+class VideoFrameSampler:
+    """Frames of a video at a target rate, skipping near-duplicates"""
+
+    def __init__(self, video_path: str, fps: float, diff_threshold: float):
+        self.capture = cv2.VideoCapture(video_path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video {video_path}")
+        self.source_fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if self.source_fps <= 0:
+            self.source_fps = fps  # unknown rate: treat every frame as a sample
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.interval = 1.0 / fps
+        self.diff_threshold = diff_threshold
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self.frames_duplicate = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """(frame index, timestamp in seconds, BGR frame) per kept frame"""
+        next_sample = 0.0
+        previous: Optional[np.ndarray] = None
+        index = -1
+        try:
+            while True:
+                # grab() without retrieve() skips decoding frames between samples
+                if not self.capture.grab():
+                    break
+                index += 1
+                self.frames_read += 1
+                timestamp = index / self.source_fps
+                if timestamp + 1e-6 < next_sample:
+                    continue
+                next_sample += self.interval * max(1, int((timestamp - next_sample) / self.interval) + 1)
+                ok, frame = self.capture.retrieve()
+                if not ok:
+                    continue
+                self.frames_sampled += 1
+
+                thumbnail = frame_signature(frame)
+                if previous is not None and float(np.mean(cv2.absdiff(thumbnail, previous))) < self.diff_threshold:
+                    self.frames_duplicate += 1
+                    continue
+                previous = thumbnail
+                yield index, timestamp, frame
+        finally:
+            self.capture.release()
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Small blurred grey thumbnail compared between frames"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(cv2.resize(gray, (64, 64), interpolation=cv2.INTER_AREA), (5, 5), 0)
+
+
+class TimelineWriter:
+    """
+    Groups frames with detections into segments appended to a JSONL file.
+    Frames skipped as duplicates repeat the previous result, so a detection
+    lasts until the next analyzed frame; segments close after max_gap seconds
+    without detections.
+    """
+
+    def __init__(self, path: Path, max_gap: float, interval: float):
+        self.file = open(path, "w", encoding="utf-8")
+        self.max_gap = max_gap
+        self.interval = interval
+        self.segment: Optional[Dict[str, Any]] = None
+        self.last_detected = False
+        self.segments = 0
+
+    def add(self, timestamp: float, frame_index: int, confidence: float, detected: bool):
+        segment = self.segment
+        if segment is not None and self.last_detected:
+            segment["end"] = max(segment["end"], timestamp - self.interval)
+        self.last_detected = detected
+        if segment is not None and timestamp - segment["end"] > self.max_gap:
+            self.close_segment()
+            segment = None
+        if not detected:
+            return
+        if segment is None:
+            self.segment = {"start": timestamp, "end": timestamp, "start_frame": frame_index,
+                            "end_frame": frame_index, "frames": 0, "max_confidence": 0.0}
+            segment = self.segment
+        segment["end"] = timestamp
+        segment["end_frame"] = frame_index
+        segment["frames"] += 1
+        segment["max_confidence"] = max(segment["max_confidence"], confidence)
+
+    def close_segment(self):
+        if self.segment is not None:
+            self.file.write(json.dumps(self.segment) + "\n")
+            self.file.flush()
+            self.segments += 1
+            self.segment = None
+
+    def close(self):
+        self.close_segment()
+        self.file.close()
+
+
+def analyze_video_file(video_path: str, settings, fps: float, output_dir: Path) -> Dict[str, Any]:
+    """
+    Analyze a video file frame by frame.
+    Writes frames.jsonl (one line per analyzed frame), timeline.jsonl (detection
+    segments) and a mask image per frame with detections into output_dir.
+    """
+    model, device = get_model(settings)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    sampler = VideoFrameSampler(video_path, fps, settings.AI_VIDEO_DIFF_THRESHOLD)
+    transform = val_transform()
+    size = settings.AI_IMAGE_SIZE
+
+    frames: "queue.Queue" = queue.Queue(maxsize=max(1, settings.AI_VIDEO_QUEUE_SIZE))
+    stop = threading.Event()
+    producer_error: List[BaseException] = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for index, timestamp, frame in sampler:
+                image_rgb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (size, size))
+                item = (index, timestamp, frame.shape[:2], transform(image=image_rgb)['image'])
+                if not put(item):
+                    return
+        except BaseException as e:
+            producer_error.append(e)
+        finally:
+            put(_DONE)
+
+    producer = threading.Thread(target=produce, name="video-decoder", daemon=True)
+    started = time.perf_counter()
+    producer.start()
+
+    frames_path = output_dir / "frames.jsonl"
+    timeline = TimelineWriter(output_dir / "timeline.jsonl", max_gap=max(settings.AI_VIDEO_SEGMENT_GAP, 1.0 / fps),
+                              interval=1.0 / fps)
+    analyzed = detected_frames = 0
+    confidence_sum = max_confidence = 0.0
+    batch_size = max(1, settings.AI_BATCH_SIZE)
+    try:
+        with open(frames_path, "w", encoding="utf-8") as frames_file:
+            finished = False
+            while not finished:
+                batch = []
+                while len(batch) < batch_size:
+                    item = frames.get()
+                    if item is _DONE:
+                        finished = True
+                        break
+                    batch.append(item)
+                if not batch:
+                    break
+
+                probs = predict_batch(model, device, [item[3] for item in batch])
+                for (index, timestamp, shape, _), prob in zip(batch, probs):
+                    detected = prob > settings.AI_THRESHOLD
+                    confidence = float(np.mean(detected))
+                    has_detection = confidence > 0.1
+                    record = {"frame": index, "timestamp": round(timestamp, 3),
+                              "confidence": confidence, "has_detection": has_detection, "mask_path": None}
+                    if has_detection:
+                        mask = cv2.resize(detected.astype(np.uint8) * 255, (shape[1], shape[0]),
+                                          interpolation=cv2.INTER_NEAREST)
+                        mask_path = output_dir / f"mask_{index:08d}.png"
+                        cv2.imwrite(str(mask_path), mask, [cv2.IMWRITE_PNG_COMPRESSION, settings.AI_PNG_COMPRESSION])
+                        record["mask_path"] = str(mask_path)
+                        detected_frames += 1
+                    frames_file.write(json.dumps(record) + "\n")
+                    timeline.add(timestamp, index, confidence, has_detection)
+                    analyzed += 1
+                    confidence_sum += confidence
+                    max_confidence = max(max_confidence, confidence)
+                frames_file.flush()
+    finally:
+        stop.set()
+        timeline.close()
+        producer.join()
+
+    if producer_error:
+        raise producer_error[0]
+
+    return {
+        "success": True,
+        "video_path": video_path,
+        "source_fps": sampler.source_fps,
+        "sample_fps": fps,
+        "frames_read": sampler.frames_read,
+        "frames_sampled": sampler.frames_sampled,
+        "frames_skipped_duplicate": sampler.frames_duplicate,
+        "frames_analyzed": analyzed,
+        "frames_with_detection": detected_frames,
+        "confidence": confidence_sum / analyzed if analyzed else 0.0,
+        "max_confidence": max_confidence,
+        "segments": timeline.segments,
+        "frames_path": str(frames_path),
+        "timeline_path": str(output_dir / "timeline.jsonl"),
+        "elapsed_seconds": time.perf_counter() - started,
+    }
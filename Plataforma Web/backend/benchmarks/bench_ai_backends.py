@@ -0,0 +1,117 @@
+"""
+Benchmark: AI inference backends (eager fp32, int8, TorchScript, ONNX Runtime)
+
+Usage (from backend/):
+    python export_model.py                      # export TorchScript/ONNX first
+    python -m benchmarks.bench_ai_backends
+    python -m benchmarks.bench_ai_backends --images "photos/*.jpg" --batch-size 4 --runs 20
+
+For each backend: load time, per-batch latency (mean/p50/p95), images/s,
+resident memory after loading and after the runs, and mask IoU against the
+eager fp32 output on the same inputs.
+"""
+import argparse
+import gc
+import resource
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+from app.config import settings
+from app.services.ai_backends import BACKENDS, export_path, load_backend, mask_iou, predict_masks
+from app.services.ai_service import load_model, resolve_model_path
+from benchmarks.synthetic_images import sample_inputs
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), falling back to the peak"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend: str, tensors: List[torch.Tensor], batch_size: int, runs: int,
+                reference: Optional[np.ndarray]) -> Dict:
+    checkpoint = resolve_model_path(settings)
+    path = checkpoint if backend in ("torch", "int8") else export_path(checkpoint, backend, settings.AI_EXPORT_DIR)
+    if not path.exists():
+        return {"backend": backend, "error": f"{path} not found (run export_model.py)"}
+
+    gc.collect()
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    model = load_backend(str(path), "cpu", backend, lambda p, d: load_model(p, d)[0], settings.AI_ONNX_THREADS)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    masks = predict_masks(model, tensors, batch_size, settings.AI_THRESHOLD)  # warm-up and accuracy sample
+    batch = torch.stack(tensors[:batch_size])
+    latencies = []
+    with torch.no_grad():
+        for _ in range(runs):
+            started = time.perf_counter()
+            model(batch)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    stats = {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "latency_mean_ms": statistics.mean(latencies) * 1000,
+        "latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "latency_p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "images_per_sec": len(batch) / statistics.mean(latencies),
+        "rss_model_mb": rss_loaded - rss_before,
+        "rss_mb": rss_mb(),
+        "masks": masks,
+    }
+    if reference is not None:
+        stats["mask_iou"] = float(np.mean([mask_iou(a, b) for a, b in zip(masks, reference)]))
+    del model
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends")
+    parser.add_argument("--images", help="comma-separated image globs (default: synthetic images)")
+    parser.add_argument("--count", type=int, default=8, help="images used for the accuracy check")
+    parser.add_argument("--batch-size", type=int, default=settings.AI_BATCH_SIZE)
+    parser.add_argument("--runs", type=int, default=10, help="timed forward passes per backend")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    tensors = sample_inputs(settings, args.images, args.count, settings.AI_IMAGE_SIZE)
+    batch_size = max(1, min(args.batch_size, len(tensors)))
+
+    reference = None
+    backends = args.backends.split(",")
+    # The eager fp32 output is the accuracy reference for the others
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        stats = run_backend(backend, tensors, batch_size, args.runs, reference)
+        if backend == "torch":
+            reference = stats.get("masks")
+            if backend not in backends:
+                continue
+        if "error" in stats:
+            print(f"{backend:>12}: {stats['error']}")
+            continue
+        print(f"{backend:>12}: load {stats['load_seconds']:6.2f}s  "
+              f"latency mean {stats['latency_mean_ms']:8.1f}ms p50 {stats['latency_p50_ms']:8.1f}ms "
+              f"p95 {stats['latency_p95_ms']:8.1f}ms  {stats['images_per_sec']:7.1f} img/s  "
+              f"model {stats['rss_model_mb']:7.1f}MB  rss {stats['rss_mb']:7.1f}MB  "
+              f"IoU {stats.get('mask_iou', 1.0):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: end-to-end analyze_image_with_ai (decode -> artifacts)
+
+Usage (from backend/):
+    python -m benchmarks.bench_ai_pipeline
+    python -m benchmarks.bench_ai_pipeline --resolutions 1280x720,4000x3000 --runs 20 --output ai_bench.json
+    python -m benchmarks.bench_ai_pipeline --stand-in          # ignore the real model even if present
+
+Synthetic JPEG photos are generated per resolution and analyzed in requests
+of --request-size images, with the result cache disabled. Without the
+SwinDeepLab module or checkpoint (or with --stand-in) a randomly initialised
+stand-in network of the same interface is used, so numbers are comparable
+between runs of this benchmark but not to the real model.
+
+The report is JSON: per resolution images/s, request latency p50/p95/p99,
+peak RSS and seconds per stage (decode, normalize, prefetch_wait,
+inference, postprocess, artifact_write) summed over the timed runs.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import torch
+
+from app.config import settings
+from app.services import ai_service
+from benchmarks.bench_ai_backends import rss_mb
+from benchmarks.synthetic_images import StandInDeepLab, generate_images, write_standin_checkpoint
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_settings(tmp: str, stand_in: bool, args):
+    """Settings for the run: outputs in tmp, no result cache, the stand-in checkpoint if requested"""
+    update: Dict[str, Any] = {
+        "UPLOAD_DIR": tmp,
+        "AI_CACHE_ENABLED": False,
+        "AI_BATCH_SIZE": args.batch_size,
+        "AI_IMAGE_SIZE": args.image_size,
+        "AI_ARTIFACTS": args.artifacts.split(",") if args.artifacts else [],
+    }
+    if stand_in:
+        update["AI_MODEL_PATH"] = write_standin_checkpoint(os.path.join(tmp, "standin.pth"))
+        update["AI_BACKEND"] = "torch" if settings.AI_BACKEND in ("torchscript", "onnx") else settings.AI_BACKEND
+    return settings.model_copy(update=update)
+
+
+def real_model_available() -> bool:
+    if ai_service.SwinDeepLab is None:
+        return False
+    try:
+        ai_service.resolve_model_path(settings)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def run_resolution(resolution: Tuple[int, int], run_settings, tmp: str, args) -> Dict[str, Any]:
+    width, height = resolution
+    paths = generate_images(os.path.join(tmp, f"{width}x{height}"), resolution, args.request_size)
+    ai_service.analyze_image_with_ai(paths[:1], run_settings)  # warm-up (model load, thread pools)
+
+    latencies: List[float] = []
+    stages: Dict[str, float] = {}
+    images = 0
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        result = ai_service.analyze_image_with_ai(paths, run_settings)
+        latencies.append(time.perf_counter() - started)
+        images += len(result["detections"])
+        for stage, seconds in (result.get("timings") or {}).items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "resolution": f"{width}x{height}",
+        "images": images,
+        "seconds": sum(latencies),
+        "images_per_sec": images / sum(latencies),
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "max": max(latencies) * 1000},
+        "stage_seconds": stages,
+        "stage_ms_per_image": {stage: seconds * 1000 / max(1, images) for stage, seconds in stages.items()},
+        "rss_mb": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", default="640x480,1920x1080,4000x3000", help="comma-separated WIDTHxHEIGHT")
+    parser.add_argument("--request-size", type=int, default=settings.AI_BATCH_SIZE, help="images per request")
+    parser.add_argument("--runs", type=int, default=10, help="timed requests per resolution")
+    parser.add_argument("--batch-size", type=int, default=settings.AI_BATCH_SIZE)
+    parser.add_argument("--image-size", type=int, default=settings.AI_IMAGE_SIZE, help="model input size")
+    parser.add_argument("--artifacts", default=",".join(settings.AI_ARTIFACTS), help="artifacts to write ('' for none)")
+    parser.add_argument("--stand-in", action="store_true", help="always use the stand-in network")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    stand_in = args.stand_in or not real_model_available()
+    if stand_in:
+        ai_service.SwinDeepLab = StandInDeepLab
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_settings = bench_settings(tmp, stand_in, args)
+        report = {
+            "model": "stand-in" if stand_in else str(ai_service.resolve_model_path(settings)),
+            "backend": run_settings.AI_BACKEND,
+            "image_size": run_settings.AI_IMAGE_SIZE,
+            "batch_size": run_settings.AI_BATCH_SIZE,
+            "request_size": args.request_size,
+            "runs": args.runs,
+            "artifacts": list(run_settings.AI_ARTIFACTS),
+            "torch_threads": torch.get_num_threads(),
+            "results": [],
+        }
+        for resolution in args.resolutions.split(","):
+            width, height = (int(v) for v in resolution.lower().split("x"))
+            stats = run_resolution((width, height), run_settings, tmp, args)
+            report["results"].append(stats)
+            print(f"{stats['resolution']:>10}: {stats['images_per_sec']:7.1f} img/s  "
+                  f"p50 {stats['latency_ms']['p50']:8.1f}ms p95 {stats['latency_ms']['p95']:8.1f}ms "
+                  f"p99 {stats['latency_ms']['p99']:8.1f}ms  peak rss {stats['peak_rss_mb']:7.1f}MB",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: inference worker layouts (workers x intra-op threads)
+
+Usage (from backend/):
+    python -m benchmarks.bench_ai_workers
+    python -m benchmarks.bench_ai_workers --layouts 1x8,2x4,4x2,8x1 --batches 64 --pin
+
+Each layout starts an InferencePool, waits for every worker to load the model,
+then submits all batches at once (as concurrent requests would) and reports
+images/s and per-batch latency (p50/p95, submit to result). Keep
+workers x threads at or below the number of cores.
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+import torch
+
+from app.config import settings
+from app.services.inference_pool import InferencePool, available_cores
+from benchmarks.synthetic_images import sample_inputs
+
+
+def run_layout(workers: int, threads: int, pin: bool, batch: np.ndarray, batches: int) -> Dict:
+    started = time.perf_counter()
+    pool = InferencePool(settings, workers, threads, pin)
+    try:
+        if not pool.wait_ready(timeout=300) or pool.error:
+            return {"layout": f"{workers}x{threads}", "error": pool.error or "workers did not start"}
+        load_seconds = time.perf_counter() - started
+        pool.submit(batch).result()  # warm-up
+
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for future in [pool.submit(batch) for _ in range(batches)]:
+            future.result()
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.close()
+    latencies.sort()
+    return {
+        "layout": f"{workers}x{threads}",
+        "load_seconds": load_seconds,
+        "images_per_sec": len(batch) * batches / elapsed,
+        "latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "latency_p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def main():
+    cores = len(available_cores())
+    default_layouts = ",".join(f"{w}x{max(1, cores // w)}" for w in (1, 2, 4) if w <= cores) or "1x1"
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layouts", default=default_layouts, help="comma-separated WORKERSxTHREADS")
+    parser.add_argument("--batch-size", type=int, default=settings.AI_BATCH_SIZE)
+    parser.add_argument("--batches", type=int, default=32, help="batches submitted per layout")
+    parser.add_argument("--pin", action="store_true", help="pin workers to disjoint cores")
+    args = parser.parse_args()
+
+    batch = torch.stack(sample_inputs(settings, None, args.batch_size, settings.AI_IMAGE_SIZE)).numpy()
+    print(f"{cores} cores, batch {len(batch)}x{settings.AI_IMAGE_SIZE}px, {args.batches} batches per layout")
+    for layout in args.layouts.split(","):
+        workers, threads = (int(v) for v in layout.lower().split("x"))
+        stats = run_layout(workers, threads, args.pin, batch, args.batches)
+        if "error" in stats:
+            print(f"{stats['layout']:>6}: {stats['error']}")
+            continue
+        print(f"{stats['layout']:>6}: start {stats['load_seconds']:6.2f}s  {stats['images_per_sec']:7.1f} img/s  "
+              f"latency p50 {stats['latency_p50_ms']:8.1f}ms p95 {stats['latency_p95_ms']:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: bulk IFC ingestion vs. the legacy per-object ORM loop
+
+Usage (from backend/):
+    python -m benchmarks.bench_ifc_ingestion --elements 20000
+    python -m benchmarks.bench_ifc_ingestion --ifc model.ifc --database-url postgresql://...
+    python -m benchmarks.bench_ifc_ingestion --modes bulk,parallel --workers 8
+
+Each mode runs against freshly created tables. Without --database-url a
+temporary SQLite database is used.
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import ifcopenshell
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import IFCFile
+from app.services.ifc_processor import ingest_elements_bulk, ingest_elements_orm
+from benchmarks.synthetic_ifc import generate_ifc
+
+MODES = {
+    "orm": lambda db, ifc, file_id, path, workers: ingest_elements_orm(db, ifc, file_id),
+    "bulk": lambda db, ifc, file_id, path, workers: ingest_elements_bulk(db, ifc, file_id),
+    "parallel": lambda db, ifc, file_id, path, workers: ingest_elements_bulk(db, ifc, file_id, path, workers),
+}
+
+
+def run_mode(mode: str, database_url: str, ifc_path: str, workers: int) -> dict:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        ifc_file = IFCFile(filename=Path(ifc_path).name, file_path=ifc_path)
+        db.add(ifc_file)
+        db.commit()
+        ifc_file_obj = ifcopenshell.open(ifc_path)
+        return MODES[mode](db, ifc_file_obj, ifc_file.id, ifc_path, workers)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ifc", help="IFC file to ingest (default: generate a synthetic model)")
+    parser.add_argument("--elements", type=int, default=5000, help="products in the synthetic model")
+    parser.add_argument("--database-url", help="target database (tables are dropped and recreated!)")
+    parser.add_argument("--modes", default="orm,bulk", help="comma-separated modes: orm, bulk, parallel")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes for the parallel mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ifc_path = args.ifc or generate_ifc(os.path.join(tmp, "synthetic.ifc"), elements=args.elements)
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        results = {}
+        for mode in args.modes.split(","):
+            stats = run_mode(mode, database_url, ifc_path, args.workers)
+            results[mode] = stats
+            print(f"{mode:>8}: {stats['rows']:>8} rows  {stats['seconds']:8.2f}s  {stats['rows_per_sec']:10.0f} rows/s")
+
+        if "orm" in results and "bulk" in results and results["bulk"]["seconds"] > 0:
+            print(f"speedup: {results['orm']['seconds'] / results['bulk']['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Check: list endpoints run a constant number of SQL statements (no N+1)
+
+Usage (from backend/):
+    python -m benchmarks.check_query_counts
+    python -m benchmarks.check_query_counts --sizes 5,200 --verbose
+
+Seeds a temporary SQLite database with one IFC file per size (assets with
+inspections and photos), calls each list endpoint for the small and the
+large file and exits with status 1 if any endpoint's statement count grows
+with the number of rows it returns.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db
+from app.models import Asset, IFCElement, IFCFile, Inspection, InspectionPhoto
+from app.services.blender_sync import sync_from_blender
+from app.services.query_counter import assert_constant_queries
+from main import app
+
+
+def seed(db, size: int) -> IFCFile:
+    """An IFC file with size elements/assets, two inspections per asset and two photos per inspection"""
+    ifc_file = IFCFile(filename=f"synthetic_{size}.ifc", file_path=f"synthetic_{size}.ifc")
+    db.add(ifc_file)
+    db.flush()
+    started = datetime(2024, 1, 1)
+    for index in range(size):
+        guid = f"{size:04d}{index:018d}"
+        asset = Asset(ifc_guid=guid, name=f"Asset {index}", ifc_type="IfcWall", ifc_file_id=ifc_file.id)
+        db.add(asset)
+        db.flush()
+        db.add(IFCElement(ifc_id=index, ifc_guid=guid, ifc_type="IfcWall", ifc_file_id=ifc_file.id,
+                          asset_id=asset.id))
+        for number in range(2):
+            inspection = Inspection(
+                code=f"INSP-{size}-{index}-{number}", inspection_date=started + timedelta(days=index + number),
+                has_pathology=bool(number), severity=2, location="synthetic", asset_id=asset.id,
+            )
+            db.add(inspection)
+            db.flush()
+            for photo in range(2):
+                name = f"{inspection.code}-{photo}.jpg"
+                db.add(InspectionPhoto(inspection_id=inspection.id, file_name=name, file_path=name))
+    db.commit()
+    return ifc_file
+
+
+def endpoint_calls(client: TestClient, session_factory, file_ids: Dict[int, int]) -> Dict[str, Dict[int, Callable]]:
+    """name -> {result size: call}; each call raises if the request fails"""
+
+    def get(url, **params):
+        return lambda: client.get(url, params=params).raise_for_status()
+
+    def post(url, body):
+        return lambda: client.post(url, json=body).raise_for_status()
+
+    def from_blender(file_id):
+        with session_factory() as db:
+            guids = [row.ifc_guid for row in db.query(Asset.ifc_guid).filter(Asset.ifc_file_id == file_id)]
+            payload = {"assets": [{"ifc_guid": guid, "condition_status": "Good"} for guid in guids]}
+
+        def call():
+            # Counted from here: a fresh session, as in a request
+            with session_factory() as db:
+                sync_from_blender(db.get(IFCFile, file_id), db, payload)
+        return call
+
+    items = file_ids.items()
+    return {
+        "GET /api/inspections/": {size: get("/api/inspections/", limit=size * 2) for size in file_ids},
+        "GET /api/assets/": {size: get("/api/assets/", ifc_file_id=i, limit=10000) for size, i in items},
+        "GET /api/assets/filter": {
+            size: get("/api/assets/filter", ifc_file_id=i, ifc_type="IfcWall", limit=10000) for size, i in items
+        },
+        "GET /api/ifc/{id}/elements": {size: get(f"/api/ifc/{i}/elements", limit=10000) for size, i in items},
+        "GET /api/ifc/{id}/assets": {size: get(f"/api/ifc/{i}/assets", limit=10000) for size, i in items},
+        "GET /api/blender/{id}/blender-data": {size: get(f"/api/blender/{i}/blender-data") for size, i in items},
+        "POST /api/blender/sync (to_blender)": {
+            size: post("/api/blender/sync", {"ifc_file_id": i, "sync_direction": "to_blender"}) for size, i in items
+        },
+        "sync_from_blender": {size: from_blender(i) for size, i in items},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="3,30", help="two or more comma-separated asset counts")
+    parser.add_argument("--verbose", action="store_true", help="print the statement counts")
+    args = parser.parse_args()
+    sizes = sorted({int(size) for size in args.sizes.split(",")})
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'queries.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            with Session() as db:
+                file_ids = {size: seed(db, size).id for size in sizes}
+            checks = endpoint_calls(TestClient(app), Session, file_ids)
+            for name, calls in checks.items():
+                try:
+                    counts = assert_constant_queries(engine, name, calls)
+                except AssertionError as e:
+                    failures.append(str(e))
+                    print(f"FAIL {name}")
+                    continue
+                print(f"  ok {name}" + (f": {counts}" if args.verbose else ""))
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Synthetic IFC model generator for ingestion benchmarks
+Builds a site/building/storey/space tree with extruded-box products and
+property sets shared by many elements (like type-driven real models)
+"""
+import random
+
+import ifcopenshell
+import ifcopenshell.guid
+
+PRODUCT_TYPES = ["IfcWall", "IfcSlab", "IfcBeam", "IfcColumn", "IfcDoor", "IfcWindow", "IfcBuildingElementProxy"]
+
+
+def generate_ifc(path: str, elements: int = 1000, storeys: int = 4, spaces_per_storey: int = 5,
+                 shared_psets: int = 20, with_geometry: bool = True, seed: int = 0) -> str:
+    """Write a synthetic IFC4 model with the given number of products to path"""
+    rng = random.Random(seed)
+    f = ifcopenshell.file(schema="IFC4")
+
+    def guid():
+        return ifcopenshell.guid.compress(rng.getrandbits(128).to_bytes(16, "big").hex())
+
+    owner = None
+    origin = f.createIfcCartesianPoint((0.0, 0.0, 0.0))
+    axis = f.createIfcAxis2Placement3D(origin, None, None)
+    context = f.createIfcGeometricRepresentationContext(None, "Model", 3, 1.0e-5, axis, None)
+    units = f.createIfcUnitAssignment([f.createIfcSIUnit(None, "LENGTHUNIT", None, "METRE")])
+    project = f.createIfcProject(guid(), owner, "Synthetic Project", "Benchmark model", None, None, None, [context], units)
+
+    def placement(relative_to=None, xyz=(0.0, 0.0, 0.0)):
+        point = f.createIfcCartesianPoint(tuple(float(v) for v in xyz))
+        return f.createIfcLocalPlacement(relative_to, f.createIfcAxis2Placement3D(point, None, None))
+
+    site_placement = placement()
+    site = f.createIfcSite(guid(), owner, "Site", None, None, site_placement, None, None, "ELEMENT")
+    building_placement = placement(site_placement)
+    building = f.createIfcBuilding(guid(), owner, "Building A", None, None, building_placement, None, None, "ELEMENT")
+    f.createIfcRelAggregates(guid(), owner, None, None, project, [site])
+    f.createIfcRelAggregates(guid(), owner, None, None, site, [building])
+
+    containers = []
+    storey_objects = []
+    for level in range(storeys):
+        storey_placement = placement(building_placement, (0, 0, level * 3.0))
+        storey = f.createIfcBuildingStorey(guid(), owner, f"Level {level}", None, None, storey_placement,
+                                           None, None, "ELEMENT", level * 3.0)
+        storey_objects.append(storey)
+        spaces = []
+        for index in range(spaces_per_storey):
+            space = f.createIfcSpace(guid(), owner, f"Room {level}.{index}", None, None,
+                                     placement(storey_placement), None, None, "ELEMENT", None, None)
+            spaces.append(space)
+        if spaces:
+            f.createIfcRelAggregates(guid(), owner, None, None, storey, spaces)
+        containers.append((storey, storey_placement, spaces))
+    f.createIfcRelAggregates(guid(), owner, None, None, building, storey_objects)
+
+    profiles = [f.createIfcRectangleProfileDef("AREA", None, None, 0.2 + 0.1 * i, 1.0 + 0.5 * i) for i in range(4)]
+    direction = f.createIfcDirection((0.0, 0.0, 1.0))
+
+    products = []
+    contained = {}
+    for index in range(elements):
+        ifc_type = PRODUCT_TYPES[index % len(PRODUCT_TYPES)]
+        storey, storey_placement, spaces = containers[index % len(containers)]
+        xyz = (rng.uniform(0, 200), rng.uniform(0, 200), 0.0)
+        shape = None
+        if with_geometry:
+            solid = f.createIfcExtrudedAreaSolid(profiles[index % len(profiles)], None, direction, 3.0)
+            representation = f.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
+            shape = f.createIfcProductDefinitionShape(None, None, [representation])
+        product = f.create_entity(ifc_type, GlobalId=guid(), Name=f"{ifc_type[3:]} {index}",
+                                  ObjectPlacement=placement(storey_placement, xyz), Representation=shape)
+        products.append(product)
+        container = spaces[index % len(spaces)] if spaces and index % 3 == 0 else storey
+        contained.setdefault(container.id(), (container, []))[1].append(product)
+
+    for container, related in contained.values():
+        f.createIfcRelContainedInSpatialStructure(guid(), owner, None, None, related, container)
+
+    for pset_index in range(shared_psets):
+        properties = [
+            f.createIfcPropertySingleValue("FireRating", None, f.create_entity("IfcLabel", ["EI30", "EI60", "EI90"][pset_index % 3]), None),
+            f.createIfcPropertySingleValue("IsExternal", None, f.create_entity("IfcBoolean", pset_index % 2 == 0), None),
+            f.createIfcPropertySingleValue("ThermalTransmittance", None, f.create_entity("IfcReal", 0.1 * pset_index), None),
+            f.createIfcPropertySingleValue("Reference", None, f.create_entity("IfcIdentifier", f"TYPE-{pset_index}"), None),
+        ]
+        pset = f.createIfcPropertySet(guid(), owner, f"Pset_Common_{pset_index % 5}", None, properties)
+        related = products[pset_index::shared_psets]
+        if related:
+            f.createIfcRelDefinesByProperties(guid(), owner, None, None, related, pset)
+
+    # One element-specific property set per tenth product
+    for index, product in enumerate(products[::10]):
+        value = f.create_entity("IfcLabel", f"SN-{index:06d}")
+        pset = f.createIfcPropertySet(guid(), owner, "Pset_ManufacturerOccurrence", None,
+                                      [f.createIfcPropertySingleValue("SerialNumber", None, value, None)])
+        f.createIfcRelDefinesByProperties(guid(), owner, None, None, [product], pset)
+
+    f.write(path)
+    return path
@@ -0,0 +1,85 @@
+"""
+Synthetic inspection photos and a stand-in segmentation network for AI benchmarks
+The photos are smooth gradients with dark crack-like strokes, closer to real
+concrete photos than noise (JPEG size and decode cost are realistic). The
+stand-in network has the SwinDeepLab interface - (n, 3, H, W) normalized
+input, (n, 1, H, W) logits - with random weights, so the pipeline can be
+measured without the PonteInspecao.lib model and checkpoint.
+sample_inputs gives model inputs from real or synthetic photos for the
+benchmarks and export_model.py's accuracy check.
+"""
+import glob
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from app.services.ai_service import preprocess_image, val_transform
+
+
+def synthetic_photo(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """(height, width, 3) uint8 image: shaded surface with a few dark strokes"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 96 + 64 * np.sin(x / rng.uniform(20, 80)) * np.cos(y / rng.uniform(20, 80))
+    img = np.repeat(base.astype(np.uint8)[..., None], 3, axis=2)
+    thickness = max(2, min(width, height) // 256)
+    for _ in range(5):
+        row = int(rng.integers(0, height))
+        img[row:row + thickness, int(rng.integers(0, width // 2)):] = 20
+    return img
+
+
+def generate_images(directory: str, resolution: Tuple[int, int], count: int, seed: int = 0) -> List[str]:
+    """Write count JPEG photos of resolution (width, height) to directory and return their paths"""
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"synthetic_{width}x{height}_{index:03d}.jpg")
+        cv2.imwrite(path, synthetic_photo(width, height, rng), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        paths.append(path)
+    return paths
+
+
+def sample_inputs(settings, image_globs: Optional[str], count: int, image_size: int) -> List[torch.Tensor]:
+    """image_size x image_size tensors of the given images, or of synthetic photos when none are given"""
+    transform = val_transform()
+    if image_globs:
+        sized = settings.model_copy(update={"AI_IMAGE_SIZE": image_size})
+        paths = sorted(p for pattern in image_globs.split(",") for p in glob.glob(pattern))[:count]
+        tensors = [loaded[1] for loaded in (preprocess_image(p, sized, transform) for p in paths) if loaded]
+        if tensors:
+            return tensors
+    rng = np.random.default_rng(0)
+    return [transform(image=synthetic_photo(image_size, image_size, rng))["image"] for _ in range(count)]
+
+
+class StandInDeepLab(nn.Module):
+    """Small encoder-decoder (output stride 8) with the SwinDeepLab call signature"""
+
+    def __init__(self, width: int = 32):
+        super().__init__()
+
+        def block(c_in, c_out, stride):
+            return nn.Sequential(nn.Conv2d(c_in, c_out, 3, stride=stride, padding=1, bias=False),
+                                 nn.BatchNorm2d(c_out), nn.ReLU(inplace=True))
+
+        self.encoder = nn.Sequential(block(3, width, 2), block(width, width * 2, 2), block(width * 2, width * 4, 2),
+                                     block(width * 4, width * 4, 1))
+        self.head = nn.Conv2d(width * 4, 1, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        logits = self.head(self.encoder(x))
+        return F.interpolate(logits, size=x.shape[-2:], mode="bilinear", align_corners=False)
+
+
+def write_standin_checkpoint(path: str, seed: int = 0) -> str:
+    """Save a randomly initialised StandInDeepLab state_dict to path"""
+    torch.manual_seed(seed)
+    torch.save({"state_dict": StandInDeepLab().state_dict()}, path)
+    return path
@@ -0,0 +1,61 @@
+"""
+Export the SwinDeepLab checkpoint for the optimized CPU backends
+Run from backend/: python export_model.py [--formats torchscript,onnx]
+Writes <checkpoint>.torchscript.pt / <checkpoint>.onnx to AI_EXPORT_DIR (default:
+next to the checkpoint), then checks each export and int8 quantization
+against the eager fp32 model (mask IoU). Exports have a dynamic batch size but
+a fixed input size: re-export after changing AI_IMAGE_SIZE.
+"""
+import argparse
+from pathlib import Path
+
+from app.config import settings
+from app.services.ai_backends import (
+    EXPORT_SUFFIXES, export_onnx, export_path, export_torchscript, load_backend, mask_iou, predict_masks,
+)
+from app.services.ai_service import load_model, resolve_model_path
+from benchmarks.synthetic_images import sample_inputs
+
+EXPORTERS = {"torchscript": export_torchscript, "onnx": export_onnx}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the AI model to TorchScript and ONNX")
+    parser.add_argument("--checkpoint", help="model checkpoint (default AI_MODEL_PATH)")
+    parser.add_argument("--output-dir", help="export directory (default AI_EXPORT_DIR or the checkpoint's)")
+    parser.add_argument("--formats", default=",".join(EXPORT_SUFFIXES), help="comma-separated: torchscript, onnx")
+    parser.add_argument("--image-size", type=int, default=settings.AI_IMAGE_SIZE)
+    parser.add_argument("--images", help="comma-separated image globs for the accuracy check")
+    parser.add_argument("--min-iou", type=float, default=0.95, help="fail when an export's mean mask IoU is lower")
+    args = parser.parse_args()
+
+    checkpoint = Path(args.checkpoint) if args.checkpoint else resolve_model_path(settings)
+    output_dir = Path(args.output_dir) if args.output_dir else settings.AI_EXPORT_DIR
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    model, _ = load_model(str(checkpoint), "cpu")
+
+    paths = {}
+    for backend in args.formats.split(","):
+        if backend not in EXPORTERS:
+            parser.error(f"unknown format {backend!r}")
+        paths[backend] = EXPORTERS[backend](model, export_path(checkpoint, backend, output_dir), args.image_size)
+        print(f"Exported {backend}: {paths[backend]}")
+
+    # Accuracy check against the eager fp32 model
+    tensors = sample_inputs(settings, args.images, 8, args.image_size)
+    reference = predict_masks(model, tensors, 4, settings.AI_THRESHOLD)
+    paths["int8"] = checkpoint
+    failed = []
+    for backend, path in paths.items():
+        candidate = load_backend(str(path), "cpu", backend, lambda p, d: load_model(p, d)[0])
+        iou = float(sum(mask_iou(a, b) for a, b in zip(predict_masks(candidate, tensors, 4, settings.AI_THRESHOLD), reference)) / len(tensors))
+        print(f"{backend:>12}: mean mask IoU vs eager fp32 {iou:.4f}")
+        if iou < args.min_iou:
+            failed.append(backend)
+    if failed:
+        raise SystemExit(f"Accuracy check failed for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
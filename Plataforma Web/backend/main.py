@@ -11,6 +11,7 @@ from pathlib import Path
 from app.database import get_db, init_db
 from app.routers import ifc, inspections, ai_analysis, assets, blender_sync
 from app.config import settings
+from app.services.pagination import PAGINATION_HEADERS
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=PAGINATION_HEADERS,
 )
 
 # Include routers
@@ -45,6 +47,26 @@ async def startup_event():
     os.makedirs(settings.UPLOAD_DIR / "images", exist_ok=True)
     os.makedirs(settings.UPLOAD_DIR / "videos", exist_ok=True)
     os.makedirs(settings.UPLOAD_DIR / "results", exist_ok=True)
+    
+    # Load the AI model now so the first analysis does not pay for it
+    if settings.AI_WARM_ON_STARTUP:
+        from app.services.ai_service import get_model
+        from app.services.inference_pool import get_inference_pool
+        try:
+            # Pool workers load their own copy; otherwise warm this process
+            if get_inference_pool(settings) is None:
+                get_model(settings)
+        except (ImportError, FileNotFoundError, ValueError) as e:
+            print(f"Warning: AI model not warmed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the in-process inference server and the inference worker pool"""
+    from app.services.inference_pool import stop_inference_pool
+    from app.services.inference_server import stop_inference_server
+    await stop_inference_server()
+    stop_inference_pool()
 
 
 @app.get("/")
@@ -0,0 +1,43 @@
+"""
+IFC ingestion worker pool
+Run alongside the API: python worker.py [--processes N]
+Each process claims queued IngestionJob rows and processes them.
+"""
+import argparse
+import multiprocessing
+
+from app.config import settings
+from app.database import init_db
+from app.services.ingestion_queue import run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued IFC ingestion jobs")
+    parser.add_argument("--processes", type=int, default=settings.INGESTION_WORKERS,
+                        help="worker processes (default INGESTION_WORKERS)")
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    args = parser.parse_args()
+
+    init_db()
+    if args.processes <= 1:
+        run_worker(once=args.once)
+        return
+
+    # spawn: each worker gets its own engine and connection pool
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, kwargs={"once": args.once}, name=f"ingestion-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
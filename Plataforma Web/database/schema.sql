@@ -11,15 +11,43 @@ CREATE TABLE ifc_files (
     filename VARCHAR(255) NOT NULL,
     file_path TEXT NOT NULL,
     file_size INTEGER,
+    file_hash VARCHAR(64), -- SHA-256 of the uploaded file
     ifc_schema VARCHAR(50),
     project_name VARCHAR(255),
     project_description TEXT,
+    revision INTEGER DEFAULT 1,
     processing_status VARCHAR(50) DEFAULT 'pending',
     processing_error TEXT,
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     processed_at TIMESTAMP
 );
 
+CREATE INDEX idx_ifc_files_hash ON ifc_files(file_hash);
+
+-- Ingestion jobs (IFC processing queue, consumed by backend/worker.py)
+CREATE TABLE ingestion_jobs (
+    id SERIAL PRIMARY KEY,
+    ifc_file_id INTEGER NOT NULL REFERENCES ifc_files(id) ON DELETE CASCADE,
+    file_path TEXT NOT NULL,
+    incremental BOOLEAN DEFAULT FALSE,
+    status VARCHAR(50) NOT NULL DEFAULT 'queued', -- queued, running, completed, failed
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    worker_id VARCHAR(255),
+    heartbeat_at TIMESTAMP,
+    error TEXT,
+    progress_done INTEGER DEFAULT 0,
+    progress_total INTEGER,
+    rate DOUBLE PRECISION, -- elements per second
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX idx_ingestion_jobs_file ON ingestion_jobs(ifc_file_id);
+CREATE INDEX idx_ingestion_jobs_claim ON ingestion_jobs(status, run_after);
+
 -- IFC Elements table (raw IFC data)
 CREATE TABLE ifc_elements (
     id SERIAL PRIMARY KEY,
@@ -28,12 +56,13 @@ CREATE TABLE ifc_elements (
     ifc_type VARCHAR(255) NOT NULL,
     name VARCHAR(255),
     ifc_data JSONB,
+    content_hash VARCHAR(40), -- SHA-1 of the extracted data, for revision diffs
     ifc_file_id INTEGER NOT NULL REFERENCES ifc_files(id) ON DELETE CASCADE,
     asset_id INTEGER REFERENCES assets(id) ON DELETE SET NULL
 );
 
 CREATE INDEX idx_ifc_elements_guid ON ifc_elements(ifc_guid);
-CREATE INDEX idx_ifc_elements_file ON ifc_elements(ifc_file_id);
+CREATE INDEX idx_ifc_elements_file ON ifc_elements(ifc_file_id, id); -- keyset pagination per file
 CREATE INDEX idx_ifc_elements_type ON ifc_elements(ifc_type);
 
 -- Assets table (BIM elements with MIR data)
@@ -60,6 +89,17 @@ CREATE TABLE assets (
     location_room VARCHAR(255),
     location_coordinates GEOMETRY(POINT, 4326),
     
+    -- Geometry: bounding box and its centre in world coordinates
+    centroid_x DOUBLE PRECISION,
+    centroid_y DOUBLE PRECISION,
+    centroid_z DOUBLE PRECISION,
+    bbox_min_x DOUBLE PRECISION,
+    bbox_min_y DOUBLE PRECISION,
+    bbox_min_z DOUBLE PRECISION,
+    bbox_max_x DOUBLE PRECISION,
+    bbox_max_y DOUBLE PRECISION,
+    bbox_max_z DOUBLE PRECISION,
+    
     -- MIR: Warranty Information
     warranty_start_date TIMESTAMP,
     warranty_end_date TIMESTAMP,
@@ -90,15 +130,19 @@ CREATE TABLE assets (
 
 CREATE INDEX idx_assets_guid ON assets(ifc_guid);
 CREATE INDEX idx_assets_serial ON assets(serial_number);
-CREATE INDEX idx_assets_file ON assets(ifc_file_id);
-CREATE INDEX idx_assets_condition ON assets(condition_status);
+CREATE INDEX idx_assets_file ON assets(ifc_file_id, id); -- keyset pagination per file
+CREATE INDEX idx_assets_condition ON assets(condition_status, id);
 CREATE INDEX idx_assets_location ON assets USING GIST(location_coordinates);
+CREATE INDEX idx_assets_centroid ON assets(centroid_x, centroid_y, centroid_z);
+CREATE INDEX idx_assets_location_path ON assets(location_building, location_floor, location_room);
+CREATE INDEX idx_assets_location_room ON assets(location_room);
 
 -- Property Sets table
 CREATE TABLE property_sets (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
+    content_hash VARCHAR(40) UNIQUE, -- SHA-1 of name + properties (deduplication)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -107,6 +151,7 @@ CREATE TABLE properties (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     value TEXT,
+    value_number DOUBLE PRECISION, -- numeric form of value, for range filters
     data_type VARCHAR(50),
     unit VARCHAR(50),
     property_set_id INTEGER REFERENCES property_sets(id) ON DELETE CASCADE,
@@ -116,6 +161,8 @@ CREATE TABLE properties (
 
 CREATE INDEX idx_properties_asset ON properties(asset_id);
 CREATE INDEX idx_properties_set ON properties(property_set_id);
+CREATE INDEX idx_properties_name_value ON properties(name, value);
+CREATE INDEX idx_properties_name_number ON properties(name, value_number);
 
 -- Inspections table
 CREATE TABLE inspections (
@@ -142,8 +189,8 @@ CREATE TABLE inspections (
 );
 
 CREATE INDEX idx_inspections_code ON inspections(code);
-CREATE INDEX idx_inspections_asset ON inspections(asset_id);
-CREATE INDEX idx_inspections_date ON inspections(inspection_date);
+CREATE INDEX idx_inspections_asset ON inspections(asset_id, inspection_date, id); -- keyset pagination per asset
+CREATE INDEX idx_inspections_date ON inspections(inspection_date, id);
 CREATE INDEX idx_inspections_pathology ON inspections(has_pathology);
 
 -- Inspection Photos table
@@ -159,6 +206,28 @@ CREATE TABLE inspection_photos (
 
 CREATE INDEX idx_photos_inspection ON inspection_photos(inspection_id);
 
+-- AI detections (compact RLE mask + region polygons per analyzed photo)
+CREATE TABLE ai_detections (
+    id SERIAL PRIMARY KEY,
+    image_path TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    confidence DOUBLE PRECISION,
+    threshold DOUBLE PRECISION,
+    mask_rle TEXT, -- COCO compressed RLE, column-major
+    mask_width INTEGER,
+    mask_height INTEGER,
+    regions JSONB, -- [{"area", "bbox", "polygon"}] in image pixels
+    region_count INTEGER DEFAULT 0,
+    total_area DOUBLE PRECISION DEFAULT 0,
+    inspection_id INTEGER REFERENCES inspections(id) ON DELETE CASCADE,
+    photo_id INTEGER REFERENCES inspection_photos(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_ai_detections_inspection ON ai_detections(inspection_id);
+CREATE INDEX idx_ai_detections_photo ON ai_detections(photo_id);
+
 -- MIR Requirements tracking table
 CREATE TABLE mir_requirements (
     id SERIAL PRIMARY KEY,
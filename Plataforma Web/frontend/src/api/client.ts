@@ -32,6 +32,9 @@ export const assetsApi = {
   update: (id: number, data: any) => apiClient.put(`/api/assets/${id}`, data),
   getInspections: (id: number) => apiClient.get(`/api/assets/${id}/inspections`),
   getStatistics: (id: number) => apiClient.get(`/api/assets/${id}/statistics`),
+  // Many assets in one request; repeated asset_id=1&asset_id=2 as the API expects
+  getStatisticsBatch: (params: { asset_id?: number[]; ifc_file_id?: number }) =>
+    apiClient.get('/api/assets/statistics', { params, paramsSerializer: { indexes: null } }),
 }
 
 // Inspections endpoints